@@ -0,0 +1,312 @@
+"""Banc de charge : sessions simultanées de l'application Streamlit, hors ligne.
+
+Le banc démarre un vrai serveur (streamlit run) sur un port local, avec les
+données lues dans data/ (FRENCH_INDUSTRY_HORS_LIGNE=1) et un cache disque à part
+(.cache/banc/, FRENCH_INDUSTRY_CACHE), pour ne pas mélanger ses entrées à celles
+de l'application en ligne, puis ouvre N sessions
+qui lui parlent comme le navigateur : messages protobuf BackMsg/ForwardMsg sur
+le websocket /_stcore/stream. Les sessions partagent donc les caches et le
+processus du serveur, comme de vrais utilisateurs. streamlit.testing.AppTest ne
+convient pas ici : il remplace le Runtime global à chaque exécution et ne peut
+pas tourner dans plusieurs threads à la fois.
+
+Chaque session rejoue un parcours réaliste (changements de page dans la barre
+latérale, sélection des tables sur l'exploration, mouvements des curseurs de la
+page Prédiction). Un rerun est chronométré de l'envoi de l'action jusqu'au
+message script_finished du serveur. Pour chaque niveau de concurrence, le banc
+rapporte les latences p50/p95/p99, le débit, le CPU et la mémoire résidente
+(RSS) du serveur et de ses processus fils :
+
+    $ python banc_charge.py --sessions 1 2 4 8 16 --actions 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import psutil
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+from pretraitement import RACINE, VARIABLE_HORS_LIGNE
+
+
+APPLICATION = RACINE / 'streamlit_app.py'
+REPERTOIRE_CACHE_BANC = RACINE / '.cache' / 'banc'
+NIVEAUX_CONCURRENCE = (1, 2, 4, 8)
+NB_ACTIONS = 20
+DELAI_RERUN = 300
+DELAI_DEMARRAGE = 60
+PERIODE_ECHANTILLONNAGE = 0.25
+
+# Poids des pages dans le parcours : la prédiction et l'exploration sont les plus visitées
+POIDS_PAGES = {
+    "👋 Intro": 1,
+    "🔍 Exploration des données": 3,
+    "📌Statistiques": 1,
+    "📊 Data Visualisation": 2,
+    "🧩 Modélisation": 1,
+    "🔮 Prédiction": 4,
+    "🌍 PIB mondial": 1,
+    "📌 Conclusion": 1,
+}
+# Nombre de mouvements de curseurs enchaînés à chaque visite de la page Prédiction
+MOUVEMENTS_CURSEURS = 3
+LIBELLE_NAVIGATION = "Aller vers"
+LIBELLE_TABLE = "Sélection du Dataframe"
+
+
+def _port_libre():
+    with socket.socket() as sonde:
+        sonde.bind(('127.0.0.1', 0))
+        return sonde.getsockname()[1]
+
+
+def demarrer_serveur(port, cache=REPERTOIRE_CACHE_BANC):
+    # Serveur Streamlit hors ligne, sans navigateur ni surveillance des fichiers, avec son propre cache disque
+    environnement = dict(os.environ, **{VARIABLE_HORS_LIGNE: '1', 'FRENCH_INDUSTRY_CACHE': str(cache)})
+    serveur = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', str(APPLICATION),
+         '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        cwd=RACINE, env=environnement, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + DELAI_DEMARRAGE
+    while time.monotonic() < limite:
+        if serveur.poll() is not None:
+            raise RuntimeError("Le serveur Streamlit s'est arrêté au démarrage")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return serveur
+        except OSError:
+            time.sleep(0.2)
+    serveur.terminate()
+    raise TimeoutError("Le serveur Streamlit n'a pas répondu à temps")
+
+
+class Session:
+    """Une session utilisateur, pilotée par le protocole websocket de Streamlit."""
+
+    def __init__(self, url, graine, delai=DELAI_RERUN):
+        self.url = url
+        self.delai = delai
+        self.hasard = random.Random(graine)
+        self.connexion = None
+        # Widgets affichés (id -> (type, proto, fragment)) et valeurs choisies par l'utilisateur
+        self.widgets = {}
+        self.valeurs = {}
+        self.latences = []
+        self.erreurs = 0
+
+    async def ouvrir(self):
+        self.connexion = await websocket_connect(self.url, max_message_size=1 << 30)
+
+    def fermer(self):
+        if self.connexion is not None:
+            self.connexion.close()
+
+    async def _rerun(self, etat=None):
+        # Envoie l'état des widgets affichés (comme le navigateur) et attend la fin du script ;
+        # un widget placé dans un fragment ne relance que ce fragment
+        fragment = ''
+        if etat is not None:
+            self.valeurs[etat.id] = etat
+            fragment = self.widgets[etat.id][2]
+        message = BackMsg()
+        message.rerun_script.fragment_id = fragment
+        message.rerun_script.widget_states.widgets.extend(
+            valeur for identifiant, valeur in self.valeurs.items() if identifiant in self.widgets
+        )
+        debut = time.perf_counter()
+        await self.connexion.write_message(message.SerializeToString(), binary=True)
+
+        widgets, exception = {}, False
+        while True:
+            brut = await asyncio.wait_for(self.connexion.read_message(), self.delai)
+            if brut is None:
+                raise ConnectionError("Connexion fermée par le serveur")
+            reponse = ForwardMsg()
+            reponse.ParseFromString(brut)
+            if reponse.WhichOneof('type') == 'script_finished':
+                break
+            if reponse.WhichOneof('type') == 'delta' and reponse.delta.WhichOneof('type') == 'new_element':
+                element = reponse.delta.new_element
+                nature = element.WhichOneof('type')
+                proto = getattr(element, nature)
+                if nature == 'exception':
+                    exception = True
+                elif getattr(proto, 'id', ''):
+                    widgets[proto.id] = (nature, proto, reponse.delta.fragment_id)
+
+        self.latences.append(time.perf_counter() - debut)
+        self.erreurs += exception
+        if fragment:
+            # Seuls les widgets du fragment ont été renvoyés
+            self.widgets = {identifiant: widget for identifiant, widget in self.widgets.items()
+                            if widget[2] != fragment} | widgets
+        else:
+            self.widgets = widgets
+
+    async def _executer(self, etat=None):
+        try:
+            await self._rerun(etat)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.erreurs += 1
+
+    def _widget(self, nature, libelle):
+        for type_widget, proto, _ in self.widgets.values():
+            if type_widget == nature and proto.label == libelle:
+                return proto
+        return None
+
+    async def _choisir(self, nature, libelle, option):
+        proto = self._widget(nature, libelle)
+        if proto is not None and option in proto.options:
+            await self._executer(WidgetState(id=proto.id, int_value=list(proto.options).index(option)))
+
+    async def _bouger_curseur(self):
+        # Curseurs à une seule valeur (ceux de la page Prédiction)
+        curseurs = [proto for nature, proto, _ in self.widgets.values() if nature == 'slider' and len(proto.default) == 1]
+        if curseurs:
+            curseur = self.hasard.choice(curseurs)
+            pas = curseur.step or 1
+            valeur = self.hasard.choice(np.arange(curseur.min, curseur.max + pas / 2, pas))
+            etat = WidgetState(id=curseur.id)
+            etat.double_array_value.data.append(float(valeur))
+            await self._executer(etat)
+
+    async def parcourir(self, nb_actions):
+        # Premier affichage, puis nb_actions navigations tirées selon POIDS_PAGES
+        await self._executer()
+        pages, poids = zip(*POIDS_PAGES.items())
+        for _ in range(nb_actions):
+            page = self.hasard.choices(pages, weights=poids)[0]
+            await self._choisir('radio', LIBELLE_NAVIGATION, page)
+            if page == "🔍 Exploration des données":
+                table = self._widget('selectbox', LIBELLE_TABLE)
+                if table is not None:
+                    await self._choisir('selectbox', LIBELLE_TABLE, self.hasard.choice(table.options))
+            elif page == "🔮 Prédiction":
+                for _ in range(MOUVEMENTS_CURSEURS):
+                    await self._bouger_curseur()
+        return self
+
+
+async def _surveiller(processus, echantillons, arret, periode=PERIODE_ECHANTILLONNAGE):
+    # CPU (en % d'un cœur) et RSS cumulés du serveur et de ses processus fils (workers joblib...)
+    suivis = {}
+    while not arret.is_set():
+        try:
+            actifs = [processus] + processus.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+        cpu = rss = 0.0
+        for membre in actifs:
+            try:
+                if membre.pid not in suivis:
+                    suivis[membre.pid] = membre
+                    membre.cpu_percent(None)
+                cpu += suivis[membre.pid].cpu_percent(None)
+                rss += membre.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+        echantillons.append((cpu, rss))
+        try:
+            await asyncio.wait_for(arret.wait(), periode)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def mesurer(url, processus, nb_sessions, nb_actions=NB_ACTIONS, graine=0, delai=DELAI_RERUN):
+    # Lance nb_sessions sessions simultanées et résume leurs latences et la charge du serveur
+    sessions = [Session(url, graine + i, delai) for i in range(nb_sessions)]
+    await asyncio.gather(*(session.ouvrir() for session in sessions))
+    echantillons, arret = [], asyncio.Event()
+    moniteur = asyncio.create_task(_surveiller(processus, echantillons, arret))
+    debut = time.perf_counter()
+    try:
+        await asyncio.gather(*(session.parcourir(nb_actions) for session in sessions))
+    finally:
+        duree = time.perf_counter() - debut
+        arret.set()
+        await moniteur
+        for session in sessions:
+            session.fermer()
+
+    latences = np.array([latence for session in sessions for latence in session.latences])
+    p50, p95, p99 = np.percentile(latences, [50, 95, 99]) * 1000 if len(latences) else (np.nan,) * 3
+    cpu, rss = np.array(echantillons).T if echantillons else (np.array([np.nan]),) * 2
+    return {
+        'sessions': nb_sessions,
+        'reruns': len(latences),
+        'erreurs': sum(session.erreurs for session in sessions),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'reruns_s': len(latences) / duree,
+        'cpu_moyen_pct': np.mean(cpu),
+        'cpu_max_pct': np.max(cpu),
+        'rss_max_mo': np.max(rss) / 1e6,
+        'duree_s': duree,
+    }
+
+
+async def _banc(niveaux, nb_actions, graine, delai, prechauffage, cache):
+    port = _port_libre()
+    serveur = demarrer_serveur(port, cache)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        if prechauffage:
+            # Une session seule visite toutes les pages pour remplir les caches avant les mesures
+            session = Session(url, graine - 1, delai)
+            await session.ouvrir()
+            await session._executer()
+            for page in POIDS_PAGES:
+                await session._choisir('radio', LIBELLE_NAVIGATION, page)
+            session.fermer()
+        resultats = []
+        for nb_sessions in niveaux:
+            resultats.append(await mesurer(url, psutil.Process(serveur.pid), nb_sessions, nb_actions, graine, delai))
+            print(f"{nb_sessions} session(s) : p95 = {resultats[-1]['p95_ms']:.0f} ms", file=sys.stderr)
+        return pd.DataFrame(resultats)
+    finally:
+        serveur.terminate()
+        serveur.wait()
+
+
+def banc(niveaux=NIVEAUX_CONCURRENCE, nb_actions=NB_ACTIONS, graine=0, delai=DELAI_RERUN, prechauffage=True,
+         cache=REPERTOIRE_CACHE_BANC):
+    return asyncio.run(_banc(niveaux, nb_actions, graine, delai, prechauffage, cache))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de charge hors ligne de l'application Streamlit.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=list(NIVEAUX_CONCURRENCE),
+                        help="niveaux de concurrence successifs (nombre de sessions simultanées)")
+    parser.add_argument('--actions', type=int, default=NB_ACTIONS, help="navigations par session")
+    parser.add_argument('--graine', type=int, default=0, help="graine des parcours")
+    parser.add_argument('--delai', type=float, default=DELAI_RERUN, help="délai maximal d'un rerun, en secondes")
+    parser.add_argument('--sans-prechauffage', action='store_true', help="mesurer aussi le remplissage des caches")
+    parser.add_argument('--cache', default=REPERTOIRE_CACHE_BANC, help="répertoire du cache disque du serveur")
+    parser.add_argument('--json', help="fichier où écrire les résultats")
+    args = parser.parse_args()
+
+    resultats = banc(args.sessions, args.actions, args.graine, args.delai, not args.sans_prechauffage, args.cache)
+    print(resultats.to_string(index=False, float_format=lambda valeur: f"{valeur:.1f}"))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fichier:
+            json.dump(resultats.to_dict(orient='records'), fichier, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Intervalles de confiance bootstrap des écarts de salaire hommes/femmes.
+
+L'écart d'une catégorie est (moyenne hommes - moyenne femmes) / moyenne hommes,
+en %, calculé sur les colonnes appariées salaire_*_homme / salaire_*_femme.
+Les communes sont rééchantillonnées ensemble pour toutes les catégories : chaque
+lot tire une seule matrice d'indices (nb_tirages, nb_communes), et les lots sont
+répartis sur plusieurs processus par joblib.
+"""
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+
+# Catégories de la page Data Visualisation : libellé -> suffixe des colonnes salaire_<suffixe>_homme / _femme
+CATEGORIES = {
+    'Cadres': 'cadre',
+    'Cadres moyens': 'cadre_moyen',
+    'Employés': 'employe',
+    'Travailleurs': 'travailleur',
+}
+TRANCHES_AGE = {
+    '18-25 ans': '18-25',
+    '26-50 ans': '26-50',
+    'Plus de 50 ans': '+50',
+}
+NB_TIRAGES = 5000
+TAILLE_LOT = 250
+
+
+def ecarts(hommes, femmes):
+    # Écart relatif en % sur l'avant-dernier axe (les communes), pour chaque catégorie
+    moyenne_hommes = hommes.mean(axis=-2)
+    return (moyenne_hommes - femmes.mean(axis=-2)) / moyenne_hommes * 100
+
+
+def _lot(hommes, femmes, nb_tirages, graine):
+    # nb_tirages rééchantillonnages en une seule indexation : (nb_tirages, nb_communes, nb_categories)
+    generateur = np.random.default_rng(graine)
+    indices = generateur.integers(0, hommes.shape[0], size=(nb_tirages, hommes.shape[0]))
+    return ecarts(hommes[indices], femmes[indices])
+
+
+def intervalles_confiance(salaire, groupes, nb_tirages=NB_TIRAGES, niveau=0.95, taille_lot=TAILLE_LOT,
+                          n_jobs=-1, graine=42):
+    # groupes : libellé -> suffixe de colonne ; renvoie l'estimation et l'intervalle percentile par groupe
+    colonnes_hommes = [f"salaire_{suffixe}_homme" for suffixe in groupes.values()]
+    colonnes_femmes = [f"salaire_{suffixe}_femme" for suffixe in groupes.values()]
+    paires = salaire[colonnes_hommes + colonnes_femmes].dropna()
+    hommes = paires[colonnes_hommes].to_numpy(dtype=np.float64)
+    femmes = paires[colonnes_femmes].to_numpy(dtype=np.float64)
+
+    tailles = [taille_lot] * (nb_tirages // taille_lot) + ([nb_tirages % taille_lot] if nb_tirages % taille_lot else [])
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    lots = Parallel(n_jobs=n_jobs)(
+        delayed(_lot)(hommes, femmes, taille, graine_lot) for taille, graine_lot in zip(tailles, graines)
+    )
+    tirages = np.concatenate(lots)
+
+    alpha = (1 - niveau) / 2
+    borne_basse, borne_haute = np.quantile(tirages, [alpha, 1 - alpha], axis=0)
+    return pd.DataFrame({
+        'estimation': ecarts(hommes, femmes),
+        'borne_basse': borne_basse,
+        'borne_haute': borne_haute,
+    }, index=list(groupes))
@@ -0,0 +1,145 @@
+"""Cache sur disque des étapes coûteuses, persistant entre les redémarrages.
+
+Complète @st.cache_data (en mémoire, perdu à chaque redémarrage) : chaque
+résultat est sérialisé avec pickle dans un fichier dont le nom est l'empreinte
+du code de la fonction, des sources des modules du projet (qu'elle peut
+appeler), de ses arguments et du contenu des fichiers dont elle dépend. Les
+entrées peuvent aussi expirer après un délai, pour les données téléchargées
+dont la source peut changer sans que la clé change. Les écritures sont atomiques et le répertoire est plafonné en taille,
+les entrées les moins récemment utilisées étant supprimées en premier.
+
+    @st.cache_data
+    @cache_disque(fichiers=[FICHIER_SALAIRE])
+    def charger():
+        ...
+
+Répertoire, plafond et durée de vie des données téléchargées se règlent avec
+FRENCH_INDUSTRY_CACHE, FRENCH_INDUSTRY_CACHE_MAX_MO et
+FRENCH_INDUSTRY_CACHE_EXPIRATION_H.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from pretraitement import RACINE, ecrire_atomique, hash_fichier
+
+
+# À incrémenter pour invalider tout le cache (changement de format, de dépendance...)
+VERSION_CACHE = 2
+REPERTOIRE_CACHE = Path(os.environ.get('FRENCH_INDUSTRY_CACHE', RACINE / '.cache'))
+TAILLE_MAX_MO = float(os.environ.get('FRENCH_INDUSTRY_CACHE_MAX_MO', 1024))
+# Durée de vie (en secondes) des entrées qui dépendent de sources externes, comme les téléchargements
+EXPIRATION_DONNEES = float(os.environ.get('FRENCH_INDUSTRY_CACHE_EXPIRATION_H', 24)) * 3600
+
+# Empreintes des fichiers déjà lus, recalculées seulement si le fichier change
+_empreintes_fichiers = {}
+
+
+def _empreinte_fichier(chemin):
+    etat = os.stat(chemin)
+    signature = (etat.st_mtime_ns, etat.st_size)
+    connue = _empreintes_fichiers.get(chemin)
+    if connue is None or connue[0] != signature:
+        connue = (signature, hash_fichier(chemin))
+        _empreintes_fichiers[chemin] = connue
+    return connue[1]
+
+
+def _empreinte_valeur(empreinte, valeur):
+    # Les DataFrames sont hachés par pandas, bien plus vite qu'en les sérialisant
+    if isinstance(valeur, (pd.DataFrame, pd.Series)):
+        noms = list(valeur.columns) if isinstance(valeur, pd.DataFrame) else valeur.name
+        empreinte.update(pickle.dumps((type(valeur), noms)))
+        empreinte.update(pd.util.hash_pandas_object(valeur).to_numpy().tobytes())
+    else:
+        empreinte.update(pickle.dumps(valeur))
+
+
+def _code_fonction(fonction):
+    try:
+        return inspect.getsource(fonction)
+    except (OSError, TypeError):
+        return fonction.__code__.co_code.hex()
+
+
+def _modules_projet():
+    # Sources des modules du projet : la fonction peut appeler n'importe lequel d'entre eux
+    return sorted(RACINE.glob('*.py'))
+
+
+def cle_cache(fonction, args, kwargs, fichiers=()):
+    empreinte = hashlib.sha256()
+    empreinte.update(f"{VERSION_CACHE}:{fonction.__module__}.{fonction.__qualname__}".encode())
+    empreinte.update(_code_fonction(fonction).encode())
+    for chemin in _modules_projet():
+        empreinte.update(_empreinte_fichier(chemin).encode())
+    for chemin in fichiers:
+        empreinte.update(_empreinte_fichier(Path(chemin)).encode())
+    for valeur in args:
+        _empreinte_valeur(empreinte, valeur)
+    for nom, valeur in sorted(kwargs.items()):
+        empreinte.update(nom.encode())
+        _empreinte_valeur(empreinte, valeur)
+    return empreinte.hexdigest()
+
+
+def _lire(chemin, expiration=None):
+    # Une lecture réussie rafraîchit la date de l'entrée, qui sert à l'éviction LRU ;
+    # la date de création est donc enregistrée avec la valeur
+    with open(chemin, 'rb') as fichier:
+        cree_le, valeur = pickle.load(fichier)
+    if expiration is not None and time.time() - cree_le > expiration:
+        chemin.unlink(missing_ok=True)
+        raise FileNotFoundError(chemin)
+    os.utime(chemin)
+    return valeur
+
+
+def evincer(repertoire=REPERTOIRE_CACHE, taille_max_mo=TAILLE_MAX_MO):
+    # Supprime les entrées les moins récemment utilisées jusqu'à repasser sous le plafond
+    entrees = []
+    for entree in os.scandir(repertoire):
+        if entree.name.endswith('.pkl'):
+            try:
+                etat = entree.stat()
+            except FileNotFoundError:
+                continue
+            entrees.append((etat.st_mtime_ns, etat.st_size, entree.path))
+    total = sum(taille for _, taille, _ in entrees)
+    for _, taille, chemin in sorted(entrees):
+        if total <= taille_max_mo * 1e6:
+            break
+        try:
+            os.remove(chemin)
+        except FileNotFoundError:
+            pass
+        total -= taille
+
+
+def cache_disque(fonction=None, *, fichiers=(), expiration=None):
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            chemin = REPERTOIRE_CACHE / f"{fonction.__name__}-{cle_cache(fonction, args, kwargs, fichiers)}.pkl"
+            try:
+                return _lire(chemin, expiration)
+            except FileNotFoundError:
+                pass
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                # Entrée illisible (dépendance mise à jour...) : elle est recalculée
+                chemin.unlink(missing_ok=True)
+
+            valeur = fonction(*args, **kwargs)
+            REPERTOIRE_CACHE.mkdir(parents=True, exist_ok=True)
+            ecrire_atomique(chemin, pickle.dumps((time.time(), valeur), protocol=pickle.HIGHEST_PROTOCOL))
+            evincer()
+            return valeur
+        return enveloppe
+
+    return decorateur(fonction) if fonction is not None else decorateur
@@ -0,0 +1,87 @@
+"""Carte des départements : salaire médian et écart hommes/femmes.
+
+Les contours des 96 départements métropolitains sont livrés dans
+data/departements.geojson (Lambert-93 ramené en longitude/latitude, simplifié
+par Douglas-Peucker à 1 km et arrondi au millième de degré, soit environ 100 Ko).
+Ils dérivent de la carte de pygal_maps_fr et restent sous LGPL-3.0 ou ultérieure :
+voir data/departements.geojson.license.
+Les indicateurs sont agrégés une fois par département ; les deux indicateurs
+sont embarqués dans la même figure, et le choix de l'indicateur se fait par des
+boutons Plotly, côté navigateur, sans relancer le script.
+"""
+import json
+
+import plotly.graph_objects as go
+
+from pretraitement import DATA_DIR, joindre_salaire_etablissement
+
+
+FICHIER_DEPARTEMENTS = DATA_DIR / 'departements.geojson'
+# Indicateur -> (libellé, échelle de couleurs, format du survol)
+INDICATEURS = {
+    'salaire_median': ('Salaire net horaire médian (€)', 'Viridis', '.2f'),
+    'ecart_hf': ('Écart hommes/femmes (%)', 'Reds', '.1f'),
+}
+
+
+def charger_departements(chemin=FICHIER_DEPARTEMENTS):
+    with open(chemin, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def agreger_departements(salaire, etablissement):
+    # Une ligne par département : nombre de communes, salaire médian et écart hommes/femmes
+    communes = joindre_salaire_etablissement(salaire, etablissement[['CODGEO', 'LIBGEO', 'DEP']])
+    communes['DEP'] = communes['DEP'].astype(str).str.zfill(2)
+    groupes = communes.groupby('DEP')
+    hommes = groupes['salaire_homme'].mean()
+    femmes = groupes['salaire_femme'].mean()
+    return groupes.agg(
+        nb_communes=('CODGEO', 'size'),
+        salaire_median=('salaire', 'median'),
+    ).assign(
+        # Même définition que la page Data Visualisation : (moyenne hommes - moyenne femmes) / moyenne hommes
+        ecart_hf=(hommes - femmes) / hommes * 100,
+    ).reset_index()
+
+
+def figure_carte(departements, agregats):
+    # Départements de la carte seulement (les départements d'outre-mer n'ont pas de contour)
+    codes = {feature['id']: feature['properties']['nom'] for feature in departements['features']}
+    agregats = agregats[agregats['DEP'].isin(codes)]
+    survol = agregats.assign(nom=agregats['DEP'].map(codes))[['nom', 'nb_communes', 'salaire_median', 'ecart_hf']]
+
+    def style(indicateur):
+        libelle, couleurs, format_valeur = INDICATEURS[indicateur]
+        return {
+            'z': [agregats[indicateur].tolist()],
+            'colorscale': [couleurs],
+            'colorbar.title.text': [libelle],
+            'hovertemplate': [f"<b>%{{customdata[0]}}</b> (%{{location}})<br>{libelle} : %{{z:{format_valeur}}}"
+                              f"<br>Communes : %{{customdata[1]}}<extra></extra>"],
+        }
+
+    premier = next(iter(INDICATEURS))
+    fig = go.Figure(go.Choropleth(
+        geojson=departements,
+        locations=agregats['DEP'],
+        customdata=survol.to_numpy(),
+        marker_line_width=0.5,
+        marker_line_color='white',
+    ))
+    fig.update_traces({cle.replace('.', '_'): valeur[0] for cle, valeur in style(premier).items()})
+    fig.update_geos(fitbounds='locations', visible=False, projection_type='mercator')
+    fig.update_layout(
+        height=650,
+        margin={'l': 0, 'r': 0, 't': 40, 'b': 0},
+        updatemenus=[{
+            'type': 'buttons',
+            'direction': 'right',
+            'x': 0, 'y': 1.06, 'xanchor': 'left',
+            'buttons': [
+                {'label': libelle, 'method': 'restyle', 'args': [style(indicateur)]}
+                for indicateur, (libelle, _, _) in INDICATEURS.items()
+            ],
+        }],
+    )
+    return fig
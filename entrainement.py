@@ -0,0 +1,148 @@
+"""Ré-entraînement du modèle "Forêt aléatoire avec discrétisation".
+
+Régénère ensemble modele.pkl, feature_min_max.json, feature_intervalles.json,
+target_encoding.json et modele_manifest.json à partir des données salaire locales :
+
+    $ python entrainement.py
+    $ python entrainement.py --modele-livre       # reproduit exactement le modele.pkl livré
+    $ python entrainement.py --donnees data/net_salary_per_town_categories.csv --n-jobs 8
+"""
+import argparse
+import json
+import pickle
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+
+from pretraitement import (CIBLE, FEATURES, FICHIER_SALAIRE, RACINE, calculer_intervalles,
+                           calculer_min_max, charger_salaire_local, discretiser, ecrire_atomique, encoder_cible,
+                           hash_fichier)
+
+
+FICHIER_MODELE = 'modele.pkl'
+FICHIER_MIN_MAX = 'feature_min_max.json'
+FICHIER_INTERVALLES = 'feature_intervalles.json'
+FICHIER_TARGET_ENCODING = 'target_encoding.json'
+FICHIER_MANIFEST = 'modele_manifest.json'
+
+# Découpage du modèle livré (25 % de test, la valeur par défaut de train_test_split)
+TEST_SIZE = 0.25
+RANDOM_STATE = 42
+
+# Paramètres du modele.pkl livré : entraînés sur le découpage ci-dessus, ils le reproduisent à l'identique
+PARAMETRES_LIVRES = {'max_depth': 9, 'n_estimators': 100}
+
+# Grille de recherche des hyperparamètres
+GRILLE = {
+    'n_estimators': [100, 200],
+    'max_depth': [5, 7, 9, 11, None],
+    'min_samples_leaf': [1, 2, 4],
+}
+
+
+def calculer_metriques(modele, X, y):
+    prediction = modele.predict(X)
+    mse = mean_squared_error(y, prediction)
+    return {
+        'r2': float(r2_score(y, prediction)),
+        'mse': float(mse),
+        'mae': float(mean_absolute_error(y, prediction)),
+        'rmse': float(np.sqrt(mse)),
+    }
+
+
+def entrainer(chemin_donnees=FICHIER_SALAIRE, n_jobs=-1, grille=GRILLE, cv=5):
+    debut = time.perf_counter()
+    salaire = charger_salaire_local(chemin_donnees)
+    X = discretiser(salaire)
+    y = salaire[CIBLE]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    # Recherche des hyperparamètres : les combinaisons x plis sont réparties sur tous les coeurs
+    # par joblib, chaque forêt restant mono-thread pour éviter la sur-souscription
+    recherche = GridSearchCV(
+        RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1),
+        grille,
+        cv=KFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE),
+        scoring='r2',
+        n_jobs=n_jobs,
+        refit=False,
+    )
+    recherche.fit(X_train, y_train)
+
+    # Ré-entraînement du meilleur modèle, en parallèle sur les arbres
+    modele = RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=n_jobs, **recherche.best_params_)
+    modele.fit(X_train, y_train)
+    modele.set_params(n_jobs=None)
+
+    manifest = {
+        'modele': 'Forêt aléatoire avec discrétisation',
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'donnees': {
+            'fichier': Path(chemin_donnees).name,
+            'sha256': hash_fichier(chemin_donnees),
+            'nb_lignes': int(len(salaire)),
+        },
+        'features': FEATURES,
+        'cible': CIBLE,
+        'decoupage': {'test_size': TEST_SIZE, 'random_state': RANDOM_STATE, 'cv': cv},
+        'grille': grille,
+        'meilleurs_parametres': recherche.best_params_,
+        'score_cv_r2': float(recherche.best_score_),
+        'parametres': modele.get_params(),
+        'metriques': {
+            'train': calculer_metriques(modele, X_train, y_train),
+            'test': calculer_metriques(modele, X_test, y_test),
+        },
+        'n_jobs': joblib.cpu_count() if n_jobs == -1 else n_jobs,
+        'versions': {
+            'python': platform.python_version(),
+            'scikit-learn': sklearn.__version__,
+            'numpy': np.__version__,
+        },
+    }
+    manifest['duree_entrainement_s'] = round(time.perf_counter() - debut, 3)
+    return modele, calculer_min_max(X), calculer_intervalles(salaire), encoder_cible(salaire), manifest
+
+
+def sauvegarder(modele, min_max, intervalles, target_encoding, manifest, sortie=RACINE):
+    # Les cinq artefacts sont préparés en mémoire puis écrits ensemble
+    sortie = Path(sortie)
+    sortie.mkdir(parents=True, exist_ok=True)
+    ecrire_atomique(sortie / FICHIER_MODELE, pickle.dumps(modele))
+    ecrire_atomique(sortie / FICHIER_MIN_MAX, json.dumps(min_max, indent=4).encode())
+    ecrire_atomique(sortie / FICHIER_INTERVALLES, json.dumps(intervalles, indent=4).encode())
+    ecrire_atomique(sortie / FICHIER_TARGET_ENCODING, json.dumps(target_encoding, indent=4).encode())
+    ecrire_atomique(sortie / FICHIER_MANIFEST, json.dumps(manifest, indent=4, ensure_ascii=False, default=str).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ré-entraîne le modèle de prédiction du salaire net moyen.")
+    parser.add_argument('--donnees', default=FICHIER_SALAIRE, type=Path, help="CSV des salaires par commune")
+    parser.add_argument('--n-jobs', default=-1, type=int, help="Nombre de coeurs utilisés (-1 : tous)")
+    parser.add_argument('--cv', default=5, type=int, help="Nombre de plis de la validation croisée")
+    parser.add_argument('--sortie', default=RACINE, type=Path, help="Répertoire des artefacts générés")
+    parser.add_argument('--modele-livre', action='store_true',
+                        help="Paramètres du modèle livré au lieu de la grille de recherche")
+    args = parser.parse_args()
+
+    grille = {parametre: [valeur] for parametre, valeur in PARAMETRES_LIVRES.items()} if args.modele_livre else GRILLE
+    modele, min_max, intervalles, target_encoding, manifest = entrainer(args.donnees, n_jobs=args.n_jobs,
+                                                                        grille=grille, cv=args.cv)
+    sauvegarder(modele, min_max, intervalles, target_encoding, manifest, args.sortie)
+
+    print(f"Meilleurs paramètres : {manifest['meilleurs_parametres']}")
+    print(f"R² train : {manifest['metriques']['train']['r2']:.4f} | R² test : {manifest['metriques']['test']['r2']:.4f}")
+    print(f"Durée d'entraînement : {manifest['duree_entrainement_s']:.1f} s sur {manifest['n_jobs']} coeur(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Évaluation du modèle livré (modele.pkl) sur le jeu de test.
+
+Calcule les métriques, les résidus et l'importance des features par permutation,
+puis les enregistre dans evaluation_modele.json pour la page Modélisation :
+
+    $ python evaluation.py
+    $ python evaluation.py --n-repeats 20 --n-jobs 4
+"""
+import argparse
+import json
+import pickle
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import stats
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from entrainement import FICHIER_MODELE, RANDOM_STATE, TEST_SIZE, calculer_metriques
+from pretraitement import (CIBLE, FEATURES, RACINE, charger_salaire_local, discretiser,
+                           ecrire_atomique, hash_fichier)
+
+
+FICHIER_EVALUATION = RACINE / 'evaluation_modele.json'
+N_REPEATS = 10
+
+
+def charger_modele(chemin=RACINE / FICHIER_MODELE):
+    with open(chemin, 'rb') as fichier_modele:
+        modele = pickle.load(fichier_modele)
+    # Le modèle livré a été entraîné avec verbose=1 : on coupe les logs de chaque predict
+    modele.set_params(verbose=0)
+    return modele
+
+
+def _importance_feature(modele, X, y, colonne, score_reference, n_repeats, graine):
+    # Baisse du R² quand une seule colonne est mélangée, répétée n_repeats fois
+    generateur = np.random.default_rng(graine)
+    X_permute = X.copy()
+    valeurs = X.iloc[:, colonne].to_numpy()
+    baisses = np.empty(n_repeats)
+    for repetition in range(n_repeats):
+        X_permute.iloc[:, colonne] = generateur.permutation(valeurs)
+        baisses[repetition] = score_reference - r2_score(y, modele.predict(X_permute))
+    return baisses
+
+
+def importance_permutation(modele, X, y, n_repeats=N_REPEATS, n_jobs=-1, graine=RANDOM_STATE):
+    # Une tâche joblib par feature : les colonnes sont évaluées en parallèle
+    score_reference = r2_score(y, modele.predict(X))
+    baisses = Parallel(n_jobs=n_jobs)(
+        delayed(_importance_feature)(modele, X, y, colonne, score_reference, n_repeats, graine + colonne)
+        for colonne in range(X.shape[1])
+    )
+    return np.vstack(baisses)
+
+
+def evaluer(modele=None, n_repeats=N_REPEATS, n_jobs=-1):
+    if modele is None:
+        modele = charger_modele()
+    salaire = charger_salaire_local()
+    X = discretiser(salaire)
+    y = salaire[CIBLE]
+    # Même découpage que entrainement.py : le jeu de test n'a pas servi à l'apprentissage
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    prediction_test = modele.predict(X_test)
+    residus = y_test.to_numpy() - prediction_test
+    residus_standardises = (residus - residus.mean()) / residus.std()
+    (quantiles_theoriques, quantiles_observes), _ = stats.probplot(residus_standardises, dist='norm')
+    baisses = importance_permutation(modele, X_test, y_test, n_repeats=n_repeats, n_jobs=n_jobs)
+
+    return {
+        'modele_sha256': hash_fichier(RACINE / FICHIER_MODELE),
+        'metriques': {
+            'train': calculer_metriques(modele, X_train, y_train),
+            'test': calculer_metriques(modele, X_test, y_test),
+        },
+        'test': {
+            'reel': y_test.round(4).tolist(),
+            'prediction': prediction_test.round(4).tolist(),
+            'residus': residus.round(4).tolist(),
+            'residus_standardises': residus_standardises.round(4).tolist(),
+        },
+        'qq': {
+            'theorique': quantiles_theoriques.round(4).tolist(),
+            'observe': quantiles_observes.round(4).tolist(),
+        },
+        'importance_permutation': {
+            'features': FEATURES,
+            'moyenne': baisses.mean(axis=1).round(6).tolist(),
+            'ecart_type': baisses.std(axis=1).round(6).tolist(),
+            'n_repeats': n_repeats,
+        },
+    }
+
+
+def sauvegarder_evaluation(evaluation, chemin=FICHIER_EVALUATION):
+    ecrire_atomique(chemin, json.dumps(evaluation, separators=(',', ':')).encode())
+
+
+def charger_evaluation(chemin=FICHIER_EVALUATION):
+    # Renvoie None si l'artefact est absent ou ne correspond plus au modèle livré
+    try:
+        with open(chemin, 'r') as json_file:
+            evaluation = json.load(json_file)
+    except FileNotFoundError:
+        return None
+    if evaluation.get('modele_sha256') != hash_fichier(RACINE / FICHIER_MODELE):
+        return None
+    return evaluation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évalue modele.pkl sur le jeu de test.")
+    parser.add_argument('--n-repeats', default=N_REPEATS, type=int, help="Permutations par feature")
+    parser.add_argument('--n-jobs', default=-1, type=int, help="Nombre de coeurs utilisés (-1 : tous)")
+    args = parser.parse_args()
+
+    evaluation = evaluer(n_repeats=args.n_repeats, n_jobs=args.n_jobs)
+    sauvegarder_evaluation(evaluation)
+
+    test = evaluation['metriques']['test']
+    print(f"R² test : {test['r2']:.4f} | MSE : {test['mse']:.4f} | MAE : {test['mae']:.4f} | RMSE : {test['rmse']:.4f}")
+    for feature, importance in zip(FEATURES, evaluation['importance_permutation']['moyenne']):
+        print(f"{feature:<32} {importance:.4f}")
+
+
+if __name__ == '__main__':
+    main()
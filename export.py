@@ -0,0 +1,86 @@
+"""Export par blocs des tables filtrées en CSV ou en Parquet.
+
+Les filtres sont appliqués sous forme de masques booléens vectorisés ; seules
+les lignes d'un bloc sont copiées à la fois, le fichier produit est écrit au fil
+de l'eau (groupes de lignes Parquet via pyarrow).
+"""
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+TAILLE_BLOC = 50_000
+FORMATS = {
+    'CSV': {'extension': 'csv', 'mime': 'text/csv'},
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+
+def construire_masque(dataframe, filtres):
+    # filtres : {colonne: (min, max)} pour un intervalle, {colonne: [valeurs]} pour une liste
+    masque = np.ones(len(dataframe), dtype=bool)
+    for colonne, condition in filtres.items():
+        valeurs = dataframe[colonne]
+        if isinstance(condition, tuple):
+            minimum, maximum = condition
+            masque &= (valeurs >= minimum).to_numpy() & (valeurs <= maximum).to_numpy()
+        elif condition:
+            masque &= valeurs.isin(condition).to_numpy()
+    return masque
+
+
+def _blocs(dataframe, masque, taille_bloc):
+    # Positions des lignes retenues, découpées en blocs de taille_bloc lignes
+    positions = np.flatnonzero(masque)
+    for debut in range(0, len(positions), taille_bloc):
+        yield dataframe.iloc[positions[debut:debut + taille_bloc]]
+
+
+def ecrire_csv(dataframe, masque, fichier, taille_bloc=TAILLE_BLOC):
+    entete = True
+    for bloc in _blocs(dataframe, masque, taille_bloc):
+        fichier.write(bloc.to_csv(index=False, header=entete).encode('utf-8'))
+        entete = False
+    if entete:
+        # Aucune ligne retenue : on exporte tout de même les noms de colonnes
+        fichier.write(dataframe.head(0).to_csv(index=False).encode('utf-8'))
+
+
+def ecrire_parquet(dataframe, masque, fichier, taille_bloc=TAILLE_BLOC):
+    # Un groupe de lignes Parquet par bloc, le schéma étant fixé par le premier bloc
+    writer = None
+    try:
+        for bloc in _blocs(dataframe, masque, taille_bloc):
+            if writer is None:
+                table = pa.Table.from_pandas(bloc, preserve_index=False)
+                writer = pq.ParquetWriter(fichier, table.schema)
+            else:
+                table = pa.Table.from_pandas(bloc, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(dataframe.head(0), preserve_index=False), fichier)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def exporter(dataframe, filtres, format_export='CSV', taille_bloc=TAILLE_BLOC):
+    # Écrit l'export dans un fichier temporaire sur disque et renvoie (fichier, statistiques)
+    debut = time.perf_counter()
+    masque = construire_masque(dataframe, filtres)
+    fichier = tempfile.TemporaryFile()
+    ecriture = ecrire_csv if format_export == 'CSV' else ecrire_parquet
+    ecriture(dataframe, masque, fichier, taille_bloc)
+    taille = fichier.tell()
+    fichier.seek(0)
+    duree = time.perf_counter() - debut
+    statistiques = {
+        'nb_lignes': int(masque.sum()),
+        'taille_mo': taille / 1e6,
+        'duree_s': duree,
+        'debit_mo_s': taille / 1e6 / duree if duree > 0 else float('inf'),
+    }
+    return fichier, statistiques
@@ -0,0 +1,47 @@
+"""Données de PIB de la Banque mondiale (data/gdp_data.csv).
+
+Le fichier large (une colonne par année depuis 1960) est passé une seule fois au
+format long, sans les années vides, puis rangé par pays et par année dans des
+tableaux NumPy : la série d'un pays sur une plage d'années est une simple tranche.
+"""
+import numpy as np
+import pandas as pd
+
+from pretraitement import DATA_DIR
+
+
+FICHIER_PIB = DATA_DIR / 'gdp_data.csv'
+
+
+def charger_pib(chemin=FICHIER_PIB):
+    brut = pd.read_csv(chemin)
+    colonnes_annees = [colonne for colonne in brut.columns if colonne.isdigit()]
+
+    # Passage au format long, une seule fois, en supprimant les années sans valeur
+    long = brut.melt(id_vars=['Country Code'], value_vars=colonnes_annees, var_name='annee', value_name='pib')
+    long = long.dropna(subset=['pib'])
+    long['annee'] = long['annee'].astype(np.int16)
+    long = long.sort_values(['Country Code', 'annee'])
+
+    # Bloc de chaque pays dans les tableaux : lignes debut[i] à debut[i + 1]
+    codes, debut = np.unique(long['Country Code'].to_numpy(), return_index=True)
+    return {
+        'codes': codes,
+        'noms': dict(zip(brut['Country Code'], brut['Country Name'])),
+        'debut': np.append(debut, len(long)),
+        'annees': long['annee'].to_numpy(),
+        'valeurs': long['pib'].to_numpy(dtype=np.float32),
+        'annee_min': int(long['annee'].min()),
+        'annee_max': int(long['annee'].max()),
+    }
+
+
+def serie(pib, code, annee_debut, annee_fin):
+    # Années et PIB d'un pays entre annee_debut et annee_fin incluses
+    position = np.searchsorted(pib['codes'], code)
+    if position == len(pib['codes']) or pib['codes'][position] != code:
+        raise KeyError(code)
+    bloc = slice(pib['debut'][position], pib['debut'][position + 1])
+    annees = pib['annees'][bloc]
+    debut, fin = np.searchsorted(annees, [annee_debut, annee_fin + 1])
+    return annees[debut:fin], pib['valeurs'][bloc][debut:fin]
@@ -0,0 +1,102 @@
+"""Prédictions de chaque arbre de la forêt en un seul passage vectorisé.
+
+Les arbres de modele.pkl sont empilés dans des tableaux NumPy de même taille :
+toutes les lignes descendent tous les arbres en même temps, une profondeur à la
+fois, sans boucle Python sur les estimateurs.
+"""
+import numpy as np
+
+
+def empiler_arbres(modele):
+    # Tableaux (nb_arbres, nb_noeuds_max) ; les feuilles pointent sur elles-mêmes
+    # pour que les lignes arrivées en bout de branche n'en bougent plus
+    arbres = [estimateur.tree_ for estimateur in modele.estimators_]
+    nb_noeuds = max(arbre.node_count for arbre in arbres)
+    forme = (len(arbres), nb_noeuds)
+    foret = {
+        'feature': np.zeros(forme, dtype=np.intp),
+        'seuil': np.full(forme, np.inf),
+        'gauche': np.zeros(forme, dtype=np.intp),
+        'droite': np.zeros(forme, dtype=np.intp),
+        'valeur': np.zeros(forme),
+        'profondeur': max(arbre.max_depth for arbre in arbres),
+    }
+    for indice, arbre in enumerate(arbres):
+        n = arbre.node_count
+        feuille = arbre.children_left == -1
+        noeuds = np.arange(n)
+        foret['feature'][indice, :n] = np.where(feuille, 0, arbre.feature)
+        foret['seuil'][indice, :n] = np.where(feuille, np.inf, arbre.threshold)
+        foret['gauche'][indice, :n] = np.where(feuille, noeuds, arbre.children_left)
+        foret['droite'][indice, :n] = np.where(feuille, noeuds, arbre.children_right)
+        foret['valeur'][indice, :n] = arbre.value[:, 0, 0]
+    return foret
+
+
+def predictions_par_arbre(foret, X):
+    # Renvoie un tableau (nb_lignes, nb_arbres) ; sa moyenne par ligne vaut modele.predict(X)
+    X = np.asarray(X, dtype=np.float32)
+    nb_lignes = X.shape[0]
+    arbres = np.arange(foret['feature'].shape[0])
+    lignes = np.arange(nb_lignes)[:, None]
+    noeud = np.zeros((nb_lignes, arbres.size), dtype=np.intp)
+    for _ in range(foret['profondeur']):
+        # Comme scikit-learn, les valeurs sont comparées en float32 aux seuils
+        a_gauche = X[lignes, foret['feature'][arbres, noeud]] <= foret['seuil'][arbres, noeud]
+        noeud = np.where(a_gauche, foret['gauche'][arbres, noeud], foret['droite'][arbres, noeud])
+    return foret['valeur'][arbres, noeud]
+
+
+def niveaux_salaire(target_mapping):
+    # Valeurs de salaire connues de target_encoding.json, triées
+    return np.unique(np.array([float(valeur) for valeur in target_mapping.values()]))
+
+
+def decoder(valeurs, niveaux):
+    # Ramène chaque prédiction au salaire connu le plus proche
+    valeurs = np.asarray(valeurs, dtype=float)
+    position = np.clip(np.searchsorted(niveaux, valeurs), 1, len(niveaux) - 1)
+    plus_proche_a_gauche = (valeurs - niveaux[position - 1]) <= (niveaux[position] - valeurs)
+    return niveaux[np.where(plus_proche_a_gauche, position - 1, position)]
+
+
+def resumer_votes(votes, niveaux, top_k=5, quantiles=(0.1, 0.9)):
+    # Synthèse des votes des arbres pour une ligne : prédiction (moyenne brute, comme predict),
+    # intervalle et valeurs les plus probables (ramenés aux salaires connus)
+    decodes = decoder(votes, niveaux)
+    valeurs, effectifs = np.unique(decodes, return_counts=True)
+    ordre = np.argsort(-effectifs, kind='stable')[:top_k]
+    bas, haut = decoder(np.quantile(votes, quantiles), niveaux)
+    return {
+        'prediction': float(votes.mean()),
+        'ecart_type': float(votes.std()),
+        'intervalle': (float(bas), float(haut)),
+        'top_k': [(float(valeurs[i]), float(effectifs[i] / votes.size)) for i in ordre],
+    }
+
+
+def grille_what_if(X, niveaux=range(5)):
+    # Pour chaque ligne, chaque feature et chaque niveau : la ligne avec cette feature fixée au niveau
+    # Forme (nb_lignes, nb_features, nb_niveaux, nb_features)
+    X = np.asarray(X, dtype=float)
+    niveaux = np.asarray(niveaux, dtype=float)
+    nb_lignes, nb_features = X.shape
+    grille = np.broadcast_to(X[:, None, None, :], (nb_lignes, nb_features, niveaux.size, nb_features)).copy()
+    features = np.arange(nb_features)
+    grille[:, features, :, features] = niveaux
+    return grille
+
+
+def predire_grille(foret, grille):
+    # Les features étant discrètes, la grille ne contient que peu de combinaisons distinctes :
+    # chacune n'est prédite qu'une fois, toutes dans le même passage sur la forêt
+    lignes = grille.reshape(-1, grille.shape[-1])
+    combinaisons, inverse = np.unique(lignes, axis=0, return_inverse=True)
+    predictions = predictions_par_arbre(foret, combinaisons).mean(axis=1)
+    return predictions[inverse.ravel()].reshape(grille.shape[:-1])
+
+
+def courbes_dependance(foret, X, niveaux=range(5)):
+    # Courbes ICE (nb_lignes, nb_features, nb_niveaux) et PDP, leur moyenne sur les lignes
+    ice = predire_grille(foret, grille_what_if(X, niveaux))
+    return ice, ice.mean(axis=0)
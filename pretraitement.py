@@ -0,0 +1,130 @@
+"""Pré-traitement partagé entre l'application Streamlit et les scripts du modèle."""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+
+# Répertoires et fichiers locaux
+RACINE = Path(__file__).resolve().parent
+DATA_DIR = RACINE / 'data'
+FICHIER_SALAIRE = DATA_DIR / 'net_salary_per_town_categories.csv'
+FICHIER_ETABLISSEMENT = DATA_DIR / 'base_etablissement_par_tranche_effectif.csv'
+
+# Lecture des copies locales de data/ plutôt que du dépôt GitHub (banc de charge, poste sans réseau)
+VARIABLE_HORS_LIGNE = 'FRENCH_INDUSTRY_HORS_LIGNE'
+
+# Renommage des colonnes du jeu de données salaire
+new_column_names_salaire = {
+    'SNHM14': 'salaire',
+    'SNHMC14': 'salaire_cadre',
+    'SNHMP14': 'salaire_cadre_moyen',
+    'SNHME14': 'salaire_employe',
+    'SNHMO14': 'salaire_travailleur',
+    'SNHMF14': 'salaire_femme',
+    'SNHMFC14': 'salaire_cadre_femme',
+    'SNHMFP14': 'salaire_cadre_moyen_femme',
+    'SNHMFE14': 'salaire_employe_femme',
+    'SNHMFO14': 'salaire_travailleur_femme',
+    'SNHMH14': 'salaire_homme',
+    'SNHMHC14': 'salaire_cadre_homme',
+    'SNHMHP14': 'salaire_cadre_moyen_homme',
+    'SNHMHE14': 'salaire_employe_homme',
+    'SNHMHO14': 'salaire_travailleur_homme',
+    'SNHM1814': 'salaire_18-25',
+    'SNHM2614': 'salaire_26-50',
+    'SNHM5014': 'salaire_+50',
+    'SNHMF1814': 'salaire_18-25_femme',
+    'SNHMF2614': 'salaire_26-50_femme',
+    'SNHMF5014': 'salaire_+50_femme',
+    'SNHMH1814': 'salaire_18-25_homme',
+    'SNHMH2614': 'salaire_26-50_homme',
+    'SNHMH5014': 'salaire_+50_homme'
+}
+
+# Variables du modèle "Forêt aléatoire avec discrétisation" (dans l'ordre attendu par modele.pkl)
+COLONNES_DISCRETISEES = ['salaire_cadre', 'salaire_employe', 'salaire_homme', 'salaire_+50', 'salaire_+50_femme']
+FEATURES = [f"{colonne}_discretise" for colonne in COLONNES_DISCRETISEES]
+CIBLE = 'salaire'
+NB_INTERVALLES = 5
+
+
+def est_hors_ligne():
+    return os.environ.get(VARIABLE_HORS_LIGNE, '') not in ('', '0')
+
+
+def normaliser_codgeo(codgeo):
+    # Code commune sans zéro initial, Corse 2A/2B ramenée à 20
+    return codgeo.str.lstrip('0').str.replace('A', '0').str.replace('B', '0')
+
+
+def preparer_salaire(salaire):
+    # Renommage des colonnes et normalisation du code commune
+    salaire = salaire.rename(columns=new_column_names_salaire)
+    salaire['CODGEO'] = normaliser_codgeo(salaire['CODGEO'])
+    return salaire
+
+
+def joindre_salaire_etablissement(salaire, etablissement):
+    # Une ligne par commune présente dans les deux tables, jointes sur le code commune normalisé
+    etablissement = etablissement.assign(CODGEO=normaliser_codgeo(etablissement['CODGEO'].astype(str)))
+    return salaire.merge(etablissement.drop(columns=['LIBGEO']), on='CODGEO', how='inner')
+
+
+def charger_salaire_local(chemin=FICHIER_SALAIRE):
+    # Lecture du jeu de données salaire livré dans le dépôt
+    return preparer_salaire(pd.read_csv(chemin, sep=',', dtype={'CODGEO': str}))
+
+
+def discretiser(salaire):
+    # Découpage de chaque variable en NB_INTERVALLES intervalles de même largeur (codes 0 à 4)
+    return pd.DataFrame({
+        feature: pd.cut(salaire[colonne], bins=NB_INTERVALLES, labels=False)
+        for colonne, feature in zip(COLONNES_DISCRETISEES, FEATURES)
+    })
+
+
+def calculer_intervalles(salaire):
+    # Bornes des intervalles de discretiser(), qui dépendent des données : le niveau k
+    # d'une variable correspond à l'intervalle ]bornes[k], bornes[k + 1]]
+    return {
+        feature: pd.cut(salaire[colonne], bins=NB_INTERVALLES, labels=False, retbins=True)[1].tolist()
+        for colonne, feature in zip(COLONNES_DISCRETISEES, FEATURES)
+    }
+
+
+def encoder_cible(salaire):
+    # Correspondance code -> salaire, dans l'ordre d'apparition (format de target_encoding.json)
+    valeurs = pd.unique(salaire[CIBLE].astype(str))
+    return {str(code): valeur for code, valeur in enumerate(valeurs)}
+
+
+def calculer_min_max(X):
+    # Bornes de chaque variable pour les curseurs de la page Prédiction
+    return {feature: {'min': float(X[feature].min()), 'max': float(X[feature].max())} for feature in X.columns}
+
+
+def hash_fichier(chemin):
+    # Empreinte SHA-256 d'un fichier, lue par blocs
+    empreinte = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b''):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+def ecrire_atomique(chemin, contenu):
+    # Écriture dans un fichier temporaire du même répertoire puis renommage :
+    # les artefacts ne sont jamais lus à moitié écrits par l'application
+    chemin = Path(chemin)
+    descripteur, temporaire = tempfile.mkstemp(dir=chemin.parent, prefix=f".{chemin.name}.")
+    try:
+        with os.fdopen(descripteur, 'wb') as fichier:
+            fichier.write(contenu)
+        os.chmod(temporaire, 0o644)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
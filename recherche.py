@@ -0,0 +1,38 @@
+"""Recherche de communes par préfixe, insensible aux accents et à la casse.
+
+L'index est construit une seule fois : les noms LIBGEO normalisés sont triés,
+chaque recherche se limite ensuite à deux bisections sur ce tableau.
+"""
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+
+def normaliser(texte):
+    # "Ambérieu-en-Bugey" -> "amberieu en bugey"
+    texte = unicodedata.normalize('NFKD', str(texte))
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    texte = texte.casefold().replace('œ', 'oe').replace('æ', 'ae')
+    texte = re.sub(r"[-'’\s]+", ' ', texte)
+    return texte.strip()
+
+
+def construire_index(dataframe, colonne='LIBGEO'):
+    # Liste triée de (nom normalisé, position de la ligne)
+    noms = [normaliser(nom) for nom in dataframe[colonne]]
+    entrees = sorted(zip(noms, range(len(noms))))
+    return {
+        'cles': [nom for nom, _ in entrees],
+        'positions': [position for _, position in entrees],
+    }
+
+
+def rechercher(index, saisie, limite=20):
+    # Positions des lignes dont le nom normalisé commence par la saisie
+    prefixe = normaliser(saisie)
+    if not prefixe:
+        return []
+    debut = bisect_left(index['cles'], prefixe)
+    # Borne haute : tout nom commençant par le préfixe est inférieur à prefixe + U+10FFFF
+    fin = min(bisect_right(index['cles'], prefixe + '\U0010ffff', lo=debut), debut + limite)
+    return index['positions'][debut:fin]
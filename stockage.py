@@ -0,0 +1,152 @@
+"""Lecture hors mémoire des jeux de données volumineux (Parquet ou CSV).
+
+Les fichiers ne sont jamais chargés en entier : pyarrow.dataset parcourt les
+données par lots, en ne lisant que les colonnes demandées (projection) et en
+appliquant les filtres au plus près des fichiers (predicate pushdown). Les
+profils et agrégations sont cumulés lot par lot, la mémoire reste bornée par la
+taille d'un lot.
+
+Le jeu de données est désigné par la variable d'environnement
+FRENCH_INDUSTRY_DATASET (fichier ou répertoire) :
+
+    $ FRENCH_INDUSTRY_DATASET=/data/etablissements/ streamlit run streamlit_app.py
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+import pyarrow.dataset as ds
+
+
+VARIABLE_DATASET = 'FRENCH_INDUSTRY_DATASET'
+TAILLE_LOT = 131_072
+
+
+def chemin_dataset():
+    # Chemin configuré, ou None si le mode hors mémoire n'est pas activé
+    chemin = os.environ.get(VARIABLE_DATASET)
+    return Path(chemin) if chemin else None
+
+
+def _fichiers(chemin):
+    chemin = Path(chemin)
+    return [chemin] if chemin.is_file() else sorted(p for p in chemin.rglob('*') if p.is_file())
+
+
+def empreinte_dataset(chemin):
+    # Signature des fichiers (nom, taille, date de modification), sans les lire : elle sert de
+    # clé de cache et change dès qu'un fichier du jeu de données est ajouté, modifié ou supprimé
+    return tuple((str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in _fichiers(chemin))
+
+
+def ouvrir_dataset(chemin):
+    # Format déduit de l'extension (d'un fichier, ou des fichiers du répertoire)
+    chemin = Path(chemin)
+    fichiers = _fichiers(chemin)
+    format_dataset = 'csv' if fichiers and all(p.suffix == '.csv' for p in fichiers) else 'parquet'
+    if format_dataset == 'csv':
+        # Codes géographiques lus comme du texte ('01', '2A'), comme dans load_data()
+        colonnes_texte = {colonne: pa.string() for colonne in ('CODGEO', 'LIBGEO', 'DEP', 'REG')}
+        format_dataset = ds.CsvFileFormat(convert_options=csv.ConvertOptions(column_types=colonnes_texte))
+    return ds.dataset(chemin, format=format_dataset)
+
+
+def construire_filtre(filtres):
+    # Équivalent pyarrow de export.construire_masque : {colonne: (min, max)} ou {colonne: [valeurs]}
+    expression = None
+    for colonne, condition in filtres.items():
+        if isinstance(condition, tuple):
+            minimum, maximum = condition
+            terme = (ds.field(colonne) >= minimum) & (ds.field(colonne) <= maximum)
+        elif condition:
+            terme = ds.field(colonne).isin(list(condition))
+        else:
+            continue
+        expression = terme if expression is None else expression & terme
+    return expression
+
+
+def _lots(dataset, colonnes=None, filtres=None):
+    scanner = dataset.scanner(columns=colonnes, filter=construire_filtre(filtres or {}), batch_size=TAILLE_LOT)
+    return scanner.to_batches()
+
+
+def apercu(dataset, colonnes=None, filtres=None, nb_lignes=5):
+    # Premières lignes, sans parcourir le reste du jeu de données
+    scanner = dataset.scanner(columns=colonnes, filter=construire_filtre(filtres or {}))
+    return scanner.head(nb_lignes).to_pandas()
+
+
+def valeurs_distinctes(dataset, colonne, filtres=None):
+    # Valeurs prises par une colonne (les départements...), cumulées lot par lot
+    valeurs = set()
+    for lot in _lots(dataset, colonnes=[colonne], filtres=filtres):
+        valeurs.update(pc.unique(lot.column(colonne)).to_pylist())
+    valeurs.discard(None)
+    return sorted(valeurs, key=str)
+
+
+def profiler(dataset, filtres=None):
+    # Nombre de lignes, valeurs manquantes et statistiques des colonnes numériques, cumulés lot par lot
+    schema = dataset.schema
+    numeriques = [champ.name for champ in schema if pa.types.is_integer(champ.type) or pa.types.is_floating(champ.type)]
+    manquants = dict.fromkeys(schema.names, 0)
+    stats = {colonne: {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': None, 'max': None} for colonne in numeriques}
+    nb_lignes = 0
+
+    for lot in _lots(dataset, filtres=filtres):
+        nb_lignes += lot.num_rows
+        for colonne in schema.names:
+            manquants[colonne] += lot.column(colonne).null_count
+        for colonne in numeriques:
+            valeurs = lot.column(colonne)
+            n = len(valeurs) - valeurs.null_count
+            if n == 0:
+                continue
+            moyenne = pc.mean(valeurs).as_py()
+            m2 = pc.variance(valeurs, ddof=0).as_py() * n
+            extremes = pc.min_max(valeurs).as_py()
+            # Fusion des moments du lot avec le cumul (formule de Chan)
+            cumul = stats[colonne]
+            total = cumul['count'] + n
+            delta = moyenne - cumul['mean']
+            cumul['mean'] += delta * n / total
+            cumul['m2'] += m2 + delta ** 2 * cumul['count'] * n / total
+            cumul['count'] = total
+            cumul['min'] = extremes['min'] if cumul['min'] is None else min(cumul['min'], extremes['min'])
+            cumul['max'] = extremes['max'] if cumul['max'] is None else max(cumul['max'], extremes['max'])
+
+    description = pd.DataFrame({
+        colonne: {
+            'count': cumul['count'],
+            'mean': cumul['mean'],
+            'std': (cumul['m2'] / (cumul['count'] - 1)) ** 0.5 if cumul['count'] > 1 else float('nan'),
+            'min': cumul['min'],
+            'max': cumul['max'],
+        }
+        for colonne, cumul in stats.items()
+    })
+    return {
+        'nb_lignes': nb_lignes,
+        'nb_colonnes': len(schema.names),
+        'nb_donnees_manquantes': sum(manquants.values()),
+        'manquants': manquants,
+        'schema': schema,
+        'description': description,
+    }
+
+
+def agreger(dataset, cle, colonnes, filtres=None):
+    # Somme et effectif par valeur de la clé : agrégation partielle par lot, ajoutée au cumul
+    agregation = [(colonne, 'sum') for colonne in colonnes] + [(cle, 'count')]
+    noms = {f"{colonne}_sum": colonne for colonne in colonnes} | {f"{cle}_count": 'nb_lignes'}
+    resultat = pd.DataFrame(columns=list(noms.values()), dtype=float).rename_axis(cle)
+    for lot in _lots(dataset, colonnes=[cle] + list(colonnes), filtres=filtres):
+        partiel = pa.Table.from_batches([lot]).group_by(cle).aggregate(agregation).to_pandas()
+        partiel = partiel.rename(columns=noms).set_index(cle)
+        resultat = resultat.add(partiel, fill_value=0)
+    resultat['nb_lignes'] = resultat['nb_lignes'].astype('int64')
+    return resultat.sort_index().reset_index()
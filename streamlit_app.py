@@ -12,61 +12,60 @@ import scipy.stats as stats
 from scipy.stats import shapiro
 import pickle
 import json
+from bootstrap import CATEGORIES, NB_TIRAGES, TRANCHES_AGE, intervalles_confiance
+from cache_disque import EXPIRATION_DONNEES, cache_disque
+from carte import agreger_departements, charger_departements, figure_carte
+from pretraitement import DATA_DIR, FEATURES, discretiser, est_hors_ligne, joindre_salaire_etablissement, preparer_salaire
+from evaluation import charger_evaluation, evaluer, sauvegarder_evaluation
+from export import FORMATS, exporter
+from recherche import construire_index, rechercher
+from pib import FICHIER_PIB, charger_pib, serie
+from stockage import (agreger, apercu, chemin_dataset, empreinte_dataset, ouvrir_dataset, profiler,
+                      valeurs_distinctes)
+from prediction import courbes_dependance, empiler_arbres, niveaux_salaire, predictions_par_arbre, resumer_votes
 
 
 
+# Fragments réexécutés seuls (st.fragment à partir de Streamlit 1.37, expérimental avant)
+fragment = getattr(st, 'fragment', None) or st.experimental_fragment
+
 # Pour éviter les messages d'avertissement
 warnings.filterwarnings('ignore')
 
 # Charger les données avec cache pour améliorer les performances
+# (cache mémoire de Streamlit, doublé d'un cache disque qui survit aux redémarrages ;
+# les fichiers téléchargés pouvant changer, l'entrée disque expire après EXPIRATION_DONNEES)
 @st.cache_data
-def load_data():
+@cache_disque(expiration=EXPIRATION_DONNEES)
+def load_data(hors_ligne=False):
     urls = {
         "etablissement": 'https://raw.githubusercontent.com/ChristopheMontoriol/French_Industry_Janv24/main/data/base_etablissement_par_tranche_effectif.csv',
         "geographic": 'https://raw.githubusercontent.com/ChristopheMontoriol/French_Industry_Janv24/main/data/name_geographic_information.csv',
         "salaire": 'https://raw.githubusercontent.com/ChristopheMontoriol/French_Industry_Janv24/main/data/net_salary_per_town_categories.csv'
     }
+    if hors_ligne:
+        # Copies locales de data/ ; un fichier absent du dépôt donne une table vide
+        chemins = {nom: DATA_DIR / url.rsplit('/', 1)[1] for nom, url in urls.items()}
+        tables = {nom: pd.read_csv(chemin, sep=',') if chemin.exists() else pd.DataFrame() for nom, chemin in chemins.items()}
+        return tables['etablissement'], tables['geographic'], tables['salaire']
     etablissement = pd.read_csv(urls['etablissement'], sep=',')
     geographic = pd.read_csv(urls['geographic'], sep=',')
     salaire = pd.read_csv(urls['salaire'], sep=',')
     return etablissement, geographic, salaire
 
-etablissement, geographic, salaire = load_data()
-
 # Pré-traitement des données salaire
-new_column_names_salaire = {
-    'SNHM14': 'salaire',
-    'SNHMC14': 'salaire_cadre',
-    'SNHMP14': 'salaire_cadre_moyen',
-    'SNHME14': 'salaire_employe',
-    'SNHMO14': 'salaire_travailleur',
-    'SNHMF14': 'salaire_femme',
-    'SNHMFC14': 'salaire_cadre_femme',
-    'SNHMFP14': 'salaire_cadre_moyen_femme',
-    'SNHMFE14': 'salaire_employe_femme',
-    'SNHMFO14': 'salaire_travailleur_femme',
-    'SNHMH14': 'salaire_homme',
-    'SNHMHC14': 'salaire_cadre_homme',
-    'SNHMHP14': 'salaire_cadre_moyen_homme',
-    'SNHMHE14': 'salaire_employe_homme',
-    'SNHMHO14': 'salaire_travailleur_homme',
-    'SNHM1814': 'salaire_18-25',
-    'SNHM2614': 'salaire_26-50',
-    'SNHM5014': 'salaire_+50',
-    'SNHMF1814': 'salaire_18-25_femme',
-    'SNHMF2614': 'salaire_26-50_femme',
-    'SNHMF5014': 'salaire_+50_femme',
-    'SNHMH1814': 'salaire_18-25_homme',
-    'SNHMH2614': 'salaire_26-50_homme',
-    'SNHMH5014': 'salaire_+50_homme'
-}
-
-salaire = salaire.rename(columns=new_column_names_salaire)
-salaire['CODGEO'] = salaire['CODGEO'].str.lstrip('0').str.replace('A', '0').str.replace('B', '0')
+@st.cache_data
+@cache_disque(expiration=EXPIRATION_DONNEES)
+def charger_donnees(hors_ligne=False):
+    # Mode hors ligne passé en argument : il fait partie des clés des deux caches
+    etablissement, geographic, salaire = load_data(hors_ligne=hors_ligne)
+    return etablissement, geographic, preparer_salaire(salaire)
+
+etablissement, geographic, salaire = charger_donnees(hors_ligne=est_hors_ligne())
 
 # Configuration de la barre latérale
 st.sidebar.title("Sommaire")
-pages = ["👋 Intro", "🔍 Exploration des données", "📌Statistiques","📊 Data Visualisation", "🧩 Modélisation", "🔮 Prédiction", "📌 Conclusion"]
+pages = ["👋 Intro", "🔍 Exploration des données", "📌Statistiques","📊 Data Visualisation", "🧩 Modélisation", "🔮 Prédiction", "🌍 PIB mondial", "📌 Conclusion"]
 page = st.sidebar.radio("Aller vers", pages)
 
 # Affichage de la sélection des données uniquement pour la page "Exploration des données"
@@ -77,6 +76,9 @@ if page == pages[1]:
 
     # Sélection de la page de données
     data_pages = ["Etablissement", "Geographic", "Salaire", "Population"]
+    # Jeu de données volumineux lu hors mémoire, si FRENCH_INDUSTRY_DATASET est défini
+    if chemin_dataset() is not None:
+        data_pages.append("Dataset volumineux")
     # st.sidebar.markdown("### Choix des données")
     st.session_state.page = st.sidebar.selectbox("Sélection du Dataframe", data_pages, index=data_pages.index(st.session_state.page))
 
@@ -128,72 +130,221 @@ if page == pages[0]:
 elif page == pages[1]:
     st.header("🔍 Exploration des Données")
 
+    # Calcul des informations demandées, mis en cache sur disque
+    @st.cache_data
+    @cache_disque
+    def profiler_table(dataframe):
+        buffer = io.StringIO()
+        dataframe.info(buf=buffer)
+        return {
+            'nb_lignes': dataframe.shape[0],
+            'nb_colonnes': dataframe.shape[1],
+            'nb_doublons': dataframe.duplicated().sum(),
+            'nb_donnees_manquantes': dataframe.isna().sum().sum(),
+            'apercu': dataframe.head(),
+            'info': buffer.getvalue(),
+            'description': dataframe.describe(),
+        }
+
     # Fonction pour afficher les informations des DataFrames
     def afficher_info(dataframe, name):
         st.write(f"### {name}")
-        
-        # Calcul des informations demandées
-        nb_lignes = dataframe.shape[0]
-        nb_colonnes = dataframe.shape[1]
-        nb_doublons = dataframe.duplicated().sum()
-        nb_donnees_manquantes = dataframe.isna().sum().sum()
-        
-        # Affichage des informations calculées
-        st.write(f"**Nombre de lignes :** {nb_lignes}")
-        st.write(f"**Nombre de colonnes :** {nb_colonnes}")
-        st.write(f"**Nombre de doublons :** {nb_doublons}")
-        st.write(f"**Nombre de données manquantes :** {nb_donnees_manquantes}")
+        if dataframe.empty:
+            # Table absente des copies locales (mode hors ligne)
+            st.info(f"Le jeu de données {name} n'est pas disponible hors ligne.")
+            return
+        afficher_profil(profiler_table(dataframe))
+
+    # Affichage d'un profil, calculé en mémoire (profiler_table) ou lot par lot (profiler_dataset)
+    def afficher_profil(profil):
+        st.write(f"**Nombre de lignes :** {profil['nb_lignes']}")
+        st.write(f"**Nombre de colonnes :** {profil['nb_colonnes']}")
+        if 'nb_doublons' in profil:
+            st.write(f"**Nombre de doublons :** {profil['nb_doublons']}")
+        st.write(f"**Nombre de données manquantes :** {profil['nb_donnees_manquantes']}")
         
         st.write("#### Aperçu des premières lignes de ce jeu de données")
-        st.write(dataframe.head())
+        st.write(profil['apercu'])
         
         st.write("#### Informations principales de ce jeu de données")
-        buffer = io.StringIO()
-        dataframe.info(buf=buffer)
-        st.text(buffer.getvalue())
+        st.text(profil['info'])
         
         st.write("#### Résumé Statistique du jeu de données")
-        st.write(dataframe.describe())
+        st.write(profil['description'])
+
+    # Filtres communs à l'export et au jeu de données volumineux : départements et intervalle d'une variable.
+    # Les conditions qui ne retiennent pas moins de lignes (aucun département, intervalle complet) sont omises
+    def choisir_filtres(departements, bornes, cle):
+        filtres = {}
+        if departements is not None:
+            filtres['DEP'] = st.multiselect("Départements (tous si vide)", departements, key=f"{cle}_dep")
+        colonne_filtre = st.selectbox("Filtrer sur la variable", list(bornes), key=f"{cle}_variable")
+        minimum, maximum = bornes[colonne_filtre]
+        if minimum < maximum:
+            intervalle = st.slider("Intervalle retenu", minimum, maximum, (minimum, maximum), key=f"{cle}_intervalle")
+            if intervalle != (minimum, maximum):
+                filtres[colonne_filtre] = intervalle
+        return {colonne: condition for colonne, condition in filtres.items() if condition}
+
+    # Version hors mémoire de afficher_info : profil cumulé lot par lot par pyarrow.dataset.
+    # Les filtres sont appliqués à la lecture (predicate pushdown) ; l'empreinte des fichiers
+    # fait partie de la clé de cache, qui change quand le jeu de données est modifié
+    @st.cache_data
+    def profiler_dataset(chemin, empreinte, filtres=None):
+        profil = profiler(ouvrir_dataset(chemin), filtres)
+        profil['schema'] = profil['schema'].to_string()
+        return profil
+
+    @st.cache_data
+    def apercu_dataset(chemin, empreinte, filtres=None):
+        return apercu(ouvrir_dataset(chemin), filtres=filtres)
+
+    @st.cache_data
+    def valeurs_dataset(chemin, empreinte, colonne):
+        return valeurs_distinctes(ouvrir_dataset(chemin), colonne)
+
+    @st.cache_data
+    def agreger_dataset(chemin, empreinte, cle, colonne, filtres=None):
+        return agreger(ouvrir_dataset(chemin), cle, [colonne], filtres)
+
+    def afficher_info_dataset(chemin, name):
+        st.write(f"### {name}")
+        st.caption(f"Lecture par lots depuis {chemin}")
+        empreinte = empreinte_dataset(chemin)
+        schema = ouvrir_dataset(chemin).schema
+        profil_complet = profiler_dataset(chemin, empreinte)
+        description = profil_complet['description']
+        colonnes_numeriques = list(description.columns)
+
+        # Filtres poussés jusqu'à la lecture des fichiers
+        with st.expander("Filtrer le jeu de données"):
+            filtres = choisir_filtres(
+                valeurs_dataset(chemin, empreinte, 'DEP') if 'DEP' in schema.names else None,
+                {colonne: (float(description.loc['min', colonne]), float(description.loc['max', colonne]))
+                 for colonne in colonnes_numeriques},
+                "dataset",
+            ) or None
+        profil = profiler_dataset(chemin, empreinte, filtres) if filtres else profil_complet
+        afficher_profil(dict(profil, apercu=apercu_dataset(chemin, empreinte, filtres), info=profil['schema']))
+
+        st.write("#### Agrégation")
+        cles = [colonne for colonne in schema.names if colonne not in colonnes_numeriques]
+        cle = st.selectbox("Regrouper par", cles, index=cles.index('DEP') if 'DEP' in cles else 0)
+        colonne_somme = st.selectbox("Variable sommée", colonnes_numeriques)
+        if cle and colonne_somme:
+            agregation = agreger_dataset(chemin, empreinte, cle, colonne_somme, filtres)
+            st.plotly_chart(px.bar(agregation, x=cle, y=colonne_somme), use_container_width=True)
+            st.dataframe(agregation, hide_index=True)
+
+    # Index des noms de communes, construit une seule fois par colonne LIBGEO : la colonne est hachée
+    # avec la clé de cache, les positions de l'index correspondent donc toujours aux lignes de la table
+    @st.cache_resource
+    def charger_index_communes(libelles):
+        return construire_index(libelles.to_frame())
+
+    # Recherche d'une commune par le début de son nom (accents et majuscules ignorés).
+    # st.text_input n'envoie la saisie qu'à la validation (Entrée ou sortie du champ), pas à chaque frappe
+    def afficher_recherche(dataframe, name):
+        saisie = st.text_input("Rechercher une commune", key=f"recherche_{name}", placeholder="ex : amberieu",
+                               help="Appuyez sur Entrée pour lancer la recherche : la liste ne se met pas à jour "
+                                    "à chaque frappe.")
+        if saisie:
+            positions = rechercher(charger_index_communes(dataframe['LIBGEO']), saisie)
+            if positions:
+                st.dataframe(dataframe.iloc[positions], hide_index=True)
+            else:
+                st.write("Aucune commune trouvée.")
 
     # Affichage des informations en fonction de la page sélectionnée
+    if st.session_state.page in ("Etablissement", "Salaire"):
+        afficher_recherche(etablissement if st.session_state.page == "Etablissement" else salaire, st.session_state.page)
+
     if st.session_state.page == "Etablissement":
         afficher_info(etablissement, "Etablissement")
     elif st.session_state.page== "Geographic":
         afficher_info(geographic, "Geographic")
     elif st.session_state.page == "Salaire":
         afficher_info(salaire, "Salaire")
+    elif st.session_state.page == "Dataset volumineux":
+        afficher_info_dataset(str(chemin_dataset()), "Dataset volumineux")
     elif st.session_state.page == "Population":
         # Afficher un message pour la page Population
         st.write("Pas d'import du dataframe Population, ce jeu de données n'est pas utilisé dans notre projet.")
         # Ajouter un lien vers l'image population.jpg
         st.image('https://raw.githubusercontent.com/ChristopheMontoriol/French_Industry_Janv24/main/data/Population.jpg', use_column_width=True)
 
+    # Jointure construite une seule fois, et seulement si elle est demandée
+    @st.cache_data
+    def joindre_tables(salaire, etablissement):
+        return joindre_salaire_etablissement(salaire, etablissement)
+
+    # Export des tables filtrées, écrit par blocs
+    with st.expander("Exporter des données filtrées"):
+        tables_export = {
+            "Salaire": lambda: salaire,
+            "Etablissement": lambda: etablissement,
+            "Salaire & Etablissement": lambda: joindre_tables(salaire, etablissement),
+        }
+        choix_table = st.selectbox("Table à exporter", list(tables_export))
+        table_export = tables_export[choix_table]()
+        colonnes_numeriques = table_export.select_dtypes('number').columns.drop('REG', errors='ignore')
+        filtres = choisir_filtres(
+            sorted(table_export['DEP'].astype(str).unique()) if 'DEP' in table_export.columns else None,
+            {colonne: (float(table_export[colonne].min()), float(table_export[colonne].max()))
+             for colonne in colonnes_numeriques},
+            "export",
+        )
+
+        format_export = st.radio("Format", list(FORMATS), horizontal=True)
+        if st.button("Préparer l'export"):
+            fichier_export, statistiques = exporter(table_export, filtres, format_export)
+            st.caption(f"{statistiques['nb_lignes']} lignes, {statistiques['taille_mo']:.2f} Mo "
+                       f"écrits en {statistiques['duree_s']:.2f} s ({statistiques['debit_mo_s']:.1f} Mo/s)")
+            # st.download_button attend le contenu complet : seul le fichier final est lu, sans copie de la table,
+            # et le fichier temporaire est fermé (donc supprimé) dès qu'il a été lu
+            with fichier_export:
+                contenu_export = fichier_export.read()
+            st.download_button(
+                "Télécharger",
+                data=contenu_export,
+                file_name=f"{choix_table.lower().replace(' & ', '_')}.{FORMATS[format_export]['extension']}",
+                mime=FORMATS[format_export]['mime'],
+            )
+
 # Page de Statistiques
 elif page == pages[2]:
     st.header("📊 Statistiques")
 
 
+    # Test de normalité et matrice de corrélation, mis en cache sur disque
+    @st.cache_data
+    @cache_disque
+    def calculer_statistiques(salaire):
+        stat, p = shapiro(salaire['salaire_cadre_femme'])
+
+        # Suppression des colonnes non nécessaires
+        salaire_corr = salaire.drop(columns=['CODGEO', 'LIBGEO'])
+
+        # Création de la matrice de corrélation avec Plotly
+        matrix_corr = px.imshow(salaire_corr.corr().round(2), text_auto=True)
+
+        # Mise en forme des annotations avec deux chiffres après la virgule
+        matrix_corr.update_traces(hoverongaps=False)
+        matrix_corr.update_layout(title='Matrice de corrélation des salaires',
+                              xaxis=dict(title='Variables'),
+                              yaxis=dict(title='Variables'),
+                              width=1800,
+                              height=800)
+        return stat, p, matrix_corr
+
+    stat, p, matrix_corr = calculer_statistiques(salaire)
+
    # Test de normalité de Shapiro-Wilk
-    stat, p = shapiro(salaire['salaire_cadre_femme'])
     st.write('Test de normalité de Shapiro-Wilk pour la variable salaire_cadre_femme')
     st.write(f"**Statistique :** {stat:.3f}")
     st.write(f"**p-value :** {p:.5f}")
     st.write('La statistique est proche de 1 mais la valeur de la p-value est égale à 0 ce qui suggère que les données de la variable salaire_cadre_femme ne suivent pas une loi normale')
 
-# Suppression des colonnes non nécessaires
-    salaire_corr = salaire.drop(columns=['CODGEO', 'LIBGEO'])
-
-# Création de la matrice de corrélation avec Plotly
-    matrix_corr = px.imshow(salaire_corr.corr().round(2), text_auto=True)
-
-# Mise en forme des annotations avec deux chiffres après la virgule
-    matrix_corr.update_traces(hoverongaps=False)
-    matrix_corr.update_layout(title='Matrice de corrélation des salaires',
-                          xaxis=dict(title='Variables'),
-                          yaxis=dict(title='Variables'),
-                          width=1800,
-                          height=800)
-
 # Affichage du graphique avec Streamlit
     st.plotly_chart(matrix_corr)
 
@@ -208,36 +359,40 @@ elif page == pages[3]:
     disparite_options = ["Disparité salariale par catégorie socioprofessionnelle", "Disparité salariale par tranche d'âge"]
     disparite_choice = st.selectbox("Sélectionnez une visualisation pour la disparité salariale :", disparite_options)
     
-    # Visualisation en fonction du choix de l'utilisateur pour la disparité salariale
-    if disparite_choice == disparite_options[0]:
-        # Disparité salariale par catégorie socioprofessionnelle
-        categories = ['Cadres', 'Cadres moyens', 'Employés', 'Travailleurs']
-        disparites = [17.60531468314386, 9.887706605652797, 2.472865187964315, 14.680015141858643]
+    # Écarts hommes/femmes et intervalles de confiance bootstrap à 95 %, mis en cache par empreinte des données
+    @st.cache_data
+    @cache_disque
+    def calculer_disparites(salaire, groupes):
+        return intervalles_confiance(salaire, groupes)
+
+    def tracer_disparites(disparites, couleur, titre, xlabel):
+        erreurs = [disparites['estimation'] - disparites['borne_basse'], disparites['borne_haute'] - disparites['estimation']]
 
         fig, ax = plt.subplots(figsize=(10, 6))
-        ax.bar(categories, disparites, color='skyblue')
+        ax.bar(disparites.index, disparites['estimation'], yerr=erreurs, capsize=8, color=couleur)
 
-        ax.set_title('Disparité salariale par catégorie socioprofessionnelle')
-        ax.set_xlabel('Catégorie socioprofessionnelle')
+        ax.set_title(titre)
+        ax.set_xlabel(xlabel)
         ax.set_ylabel('Disparité salariale (%)')
 
         plt.xticks(rotation=45)
         ax.grid(axis='y', linestyle='--', alpha=0.7)
         st.pyplot(fig)
+        st.caption(f"Écart (moyenne hommes - moyenne femmes) / moyenne hommes ; intervalles de confiance à 95 % "
+                   f"obtenus par bootstrap sur les communes ({NB_TIRAGES} rééchantillonnages).")
+        st.dataframe(disparites.rename(columns={'estimation': 'Disparité (%)', 'borne_basse': 'IC 95 % bas',
+                                                'borne_haute': 'IC 95 % haut'}).style.format('{:.2f}'))
+
+    # Visualisation en fonction du choix de l'utilisateur pour la disparité salariale
+    if disparite_choice == disparite_options[0]:
+        # Disparité salariale par catégorie socioprofessionnelle
+        tracer_disparites(calculer_disparites(salaire, CATEGORIES), 'skyblue',
+                          'Disparité salariale par catégorie socioprofessionnelle', 'Catégorie socioprofessionnelle')
 
     elif disparite_choice == disparite_options[1]:
         # Disparité salariale par tranches d'âge
-        tranches_age = ['18-25 ans', '26-50 ans', 'Plus de 50 ans']
-        disparites_age = [4.286591078294969, 11.745237278240928, 20.02852196164705]
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.bar(tranches_age, disparites_age, color='lightgreen')
-        ax.set_title('Disparité salariale par tranche d\'âge')
-        ax.set_xlabel('Tranche d\'âge')
-        ax.set_ylabel('Disparité salariale (%)')
-        plt.xticks(rotation=45)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+        tracer_disparites(calculer_disparites(salaire, TRANCHES_AGE), 'lightgreen',
+                          'Disparité salariale par tranche d\'âge', 'Tranche d\'âge')
 
     st.subheader("Comparaison de salaire homme/femme")
 
@@ -245,46 +400,72 @@ elif page == pages[3]:
     comparaison_options = ["Comparaison par catégorie socioprofessionnelle", "Comparaison par tranche d'âge"]
     comparaison_choice = st.selectbox("Sélectionnez une visualisation pour la comparaison des salaires :", comparaison_options)
     
-    # Visualisation en fonction du choix de l'utilisateur pour la comparaison des salaires
-    if comparaison_choice == comparaison_options[0]:
-        # Boîte à moustaches pour chaque catégorie socioprofessionnelle : Hommes et femmes 
-        salaires_hommes = salaire[['salaire_cadre_homme', 'salaire_cadre_moyen_homme', 'salaire_employe_homme', 'salaire_travailleur_homme']]
-        salaires_femmes = salaire[['salaire_cadre_femme', 'salaire_cadre_moyen_femme', 'salaire_employe_femme', 'salaire_travailleur_femme']]
+    # Boîtes à moustaches hommes/femmes rendues en PNG, mises en cache sur disque
+    @st.cache_data
+    @cache_disque
+    def tracer_comparaison(salaire, colonnes_hommes, colonnes_femmes, etiquettes, titre, xlabel):
+        salaires_hommes = salaire[colonnes_hommes]
+        salaires_femmes = salaire[colonnes_femmes]
+        positions = np.arange(1, len(colonnes_hommes) + 1)
 
         fig, ax = plt.subplots(figsize=(10, 6))
 
         # Boîte à moustaches pour les salaires des hommes
-        ax.boxplot([salaires_hommes[col] for col in salaires_hommes.columns], positions=[1, 2, 3, 4], widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="blue"))
+        ax.boxplot([salaires_hommes[col] for col in salaires_hommes.columns], positions=positions, widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="blue"))
 
         # Boîte à moustaches pour les salaires des femmes
-        ax.boxplot([salaires_femmes[col] for col in salaires_femmes.columns], positions=[1.4, 2.4, 3.4, 4.4], widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="red"))
+        ax.boxplot([salaires_femmes[col] for col in salaires_femmes.columns], positions=positions + 0.4, widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="red"))
 
-        ax.set_title('Comparaison des salaires entre hommes et femmes pour chaque catégorie socioprofessionnelle')
-        ax.set_xlabel('Catégorie socioprofessionnelle')
+        ax.set_title(titre)
+        ax.set_xlabel(xlabel)
         ax.set_ylabel('Salaire')
-        plt.xticks([1.2, 2.2, 3.2, 4.2], ['Cadre', 'Cadre moyen', 'Employé', 'Travailleur'])
+        ax.set_xticks(positions + 0.2, etiquettes)
         ax.grid(True)
-        st.pyplot(fig)
+
+        image = io.BytesIO()
+        fig.savefig(image, format='png', bbox_inches='tight')
+        plt.close(fig)
+        return image.getvalue()
+
+    # Visualisation en fonction du choix de l'utilisateur pour la comparaison des salaires
+    if comparaison_choice == comparaison_options[0]:
+        # Boîte à moustaches pour chaque catégorie socioprofessionnelle : Hommes et femmes 
+        st.image(tracer_comparaison(
+            salaire,
+            ['salaire_cadre_homme', 'salaire_cadre_moyen_homme', 'salaire_employe_homme', 'salaire_travailleur_homme'],
+            ['salaire_cadre_femme', 'salaire_cadre_moyen_femme', 'salaire_employe_femme', 'salaire_travailleur_femme'],
+            ['Cadre', 'Cadre moyen', 'Employé', 'Travailleur'],
+            'Comparaison des salaires entre hommes et femmes pour chaque catégorie socioprofessionnelle',
+            'Catégorie socioprofessionnelle',
+        ))
 
     elif comparaison_choice == comparaison_options[1]:
         # Boîte à moustaches pour chaque tranche d'âge : Hommes et femmes 
-        salaires_hommes = salaire[['salaire_18-25_homme', 'salaire_26-50_homme', 'salaire_+50_homme']]
-        salaires_femmes = salaire[['salaire_18-25_femme', 'salaire_26-50_femme', 'salaire_+50_femme']]
+        st.image(tracer_comparaison(
+            salaire,
+            ['salaire_18-25_homme', 'salaire_26-50_homme', 'salaire_+50_homme'],
+            ['salaire_18-25_femme', 'salaire_26-50_femme', 'salaire_+50_femme'],
+            ['18-25 ans', '26-50 ans', 'Plus de 50 ans'],
+            "Comparaison des salaires entre hommes et femmes pour chaque tranche d'âge",
+            "Tranche d'âge",
+        ))
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+    st.subheader("Carte des salaires par département")
 
-        # Boîte à moustaches pour les salaires des hommes
-        ax.boxplot([salaires_hommes[col] for col in salaires_hommes.columns], positions=[1, 2, 3], widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="blue"))
+    # Agrégats par département calculés une fois, figure construite une fois par processus :
+    # le changement d'indicateur se fait dans le navigateur, par les boutons de la carte
+    @st.cache_data
+    @cache_disque
+    def calculer_agregats_departements(salaire, etablissement):
+        return agreger_departements(salaire, etablissement)
 
-        # Boîte à moustaches pour les salaires des femmes
-        ax.boxplot([salaires_femmes[col] for col in salaires_femmes.columns], positions=[1.4, 2.4, 3.4], widths=0.4, labels=salaires_hommes.columns, boxprops=dict(color="red"))
+    @st.cache_resource
+    def construire_carte(agregats):
+        return figure_carte(charger_departements(), agregats)
 
-        ax.set_title("Comparaison des salaires entre hommes et femmes pour chaque tranche d'âge")
-        ax.set_xlabel("Tranche d'âge")
-        ax.set_ylabel('Salaire')
-        plt.xticks([1.2, 2.2, 3.2], ['18-25 ans', '26-50 ans', 'Plus de 50 ans'])
-        ax.grid(True)
-        st.pyplot(fig)
+    st.plotly_chart(construire_carte(calculer_agregats_departements(salaire, etablissement)), use_container_width=True)
+    st.caption("Salaire médian des communes et écart (moyenne hommes - moyenne femmes) / moyenne hommes, "
+               "par département métropolitain.")
 
 
 # Page de Modélisation
@@ -314,14 +495,34 @@ elif page == pages[4]:
                     6. Optimisation du modèle : variation des paramètres, sélection des features utilisées, discrétisation des valeurs.
                     7. Visualisation et analyse des résultats.
                 """)
+    # Évaluation du modèle livré : artefact evaluation_modele.json, recalculé s'il ne correspond plus à modele.pkl.
+    # Sur un déploiement en lecture seule, l'évaluation recalculée est affichée sans être enregistrée
+    @st.cache_data
+    def charger_evaluation_modele():
+        evaluation = charger_evaluation()
+        if evaluation is not None:
+            return evaluation, True
+        evaluation = evaluer()
+        try:
+            sauvegarder_evaluation(evaluation)
+        except OSError:
+            return evaluation, False
+        return evaluation, True
+
+    evaluation, evaluation_enregistree = charger_evaluation_modele()
+    if not evaluation_enregistree:
+        st.warning("evaluation_modele.json ne correspond plus à modele.pkl et n'a pas pu être réécrit : "
+                   "relancez `python evaluation.py` pour le régénérer.")
+    metriques = evaluation['metriques']
+
     with st.expander("Modèle retenu") :
         data = {
         'Modèles': ['Forêt aléatoire sans optimisation', 'Forêt aléatoire avec optimisation',  'Forêt aléatoire avec ratio H/F','Forêt aléatoire avec discrétisation','Régression linéaire 1','Régression linéaire 2'],
-        'R² train': [0.9994,0.9441,0.9491,0.9456,0.9993,0.9946],
-        'R² test': [0.9977,0.8892,0.9376,0.9140,0.9996,0.9938],
-        'MSE test': [0.0117, 0.5903,0.3755,0.4577,0.0022,0.0344],
-        'MAE test': [0.0747,0.5250,0.4523,0.5240,0.0377,0.1319],
-        'RMSE test': [0.1084,0.7683, 0.6127,0.6765,0.0474,0.1855]
+        'R² train': [0.9994,0.9441,0.9491,metriques['train']['r2'],0.9993,0.9946],
+        'R² test': [0.9977,0.8892,0.9376,metriques['test']['r2'],0.9996,0.9938],
+        'MSE test': [0.0117, 0.5903,0.3755,metriques['test']['mse'],0.0022,0.0344],
+        'MAE test': [0.0747,0.5250,0.4523,metriques['test']['mae'],0.0377,0.1319],
+        'RMSE test': [0.1084,0.7683, 0.6127,metriques['test']['rmse'],0.0474,0.1855]
             }
     
             
@@ -332,12 +533,13 @@ elif page == pages[4]:
         rf_index = tab[tab['Modèles'] == 'Forêt aléatoire avec discrétisation'].index
     
         # Appliquer un style personnalisé à la ligne spécifique
-        styled_tab = tab.style.apply(lambda x: ['background: #27dce0' if x.name in rf_index else '' for i in x], axis=1)
+        styled_tab = tab.style.apply(lambda x: ['background: #27dce0' if x.name in rf_index else '' for i in x], axis=1).format(precision=4)
     
     
         # Afficher le tableau avec le style appliqué
         st.subheader("Synthèse des métriques de performance")
         st.table(styled_tab)
+        st.caption("Les métriques de la forêt aléatoire avec discrétisation sont calculées sur le modèle livré (modele.pkl), les autres proviennent de nos notebooks.")
         st.markdown("""
                     ##### Choix du modèle :
                     - Les modèles de régression linaires 1 & 2 font de l'overfitting même après optimisation.                     
@@ -351,12 +553,34 @@ elif page == pages[4]:
 
 
     with st.expander("Evaluation graphique du modèle") :
+        resultats_test = pd.DataFrame(evaluation['test'])
+
         st.subheader("Dispersion des résidus & distributions des résidus")
-        image_distrib = "https://zupimages.net/up/24/35/r6ed.png"
-        st.image(image_distrib, use_column_width=True)
+        col1, col2 = st.columns(2)
+        fig_residus = px.scatter(resultats_test, x='prediction', y='residus_standardises', opacity=0.5,
+                                 labels={'prediction': 'Prédictions', 'residus_standardises': 'Résidus standardisés'},
+                                 title='Dispersion des résidus')
+        fig_residus.add_hline(y=0, line_dash='dash', line_color='red')
+        col1.plotly_chart(fig_residus, use_container_width=True)
+        fig_distrib = px.histogram(resultats_test, x='residus', nbins=50,
+                                   labels={'residus': 'Résidus'}, title='Distribution des résidus')
+        col2.plotly_chart(fig_distrib, use_container_width=True)
+
         st.subheader("Comparaison des predictions VS réelles & QQ plot des résidus")
-        image_comparaison = "https://zupimages.net/up/24/35/t9c6.png"
-        st.image(image_comparaison, use_column_width=True)
+        col1, col2 = st.columns(2)
+        fig_comparaison = px.scatter(resultats_test, x='reel', y='prediction', opacity=0.5,
+                                     labels={'reel': 'Valeurs réelles', 'prediction': 'Prédictions'},
+                                     title='Prédictions VS valeurs réelles')
+        bornes = [resultats_test['reel'].min(), resultats_test['reel'].max()]
+        fig_comparaison.add_scatter(x=bornes, y=bornes, mode='lines', line=dict(color='red', dash='dash'), showlegend=False)
+        col1.plotly_chart(fig_comparaison, use_container_width=True)
+        qq = evaluation['qq']
+        fig_qq = px.scatter(x=qq['theorique'], y=qq['observe'],
+                            labels={'x': 'Quantiles théoriques', 'y': 'Quantiles observés'},
+                            title='QQ plot des résidus')
+        fig_qq.add_scatter(x=[min(qq['theorique']), max(qq['theorique'])], y=[min(qq['theorique']), max(qq['theorique'])],
+                           mode='lines', line=dict(color='red', dash='dash'), showlegend=False)
+        col2.plotly_chart(fig_qq, use_container_width=True)
             
         st.markdown("""
                     ##### Conclusions :         
@@ -368,8 +592,11 @@ elif page == pages[4]:
     
     with st.expander("Features d'importance") :
         st.subheader("Histogramme des Features d'importance")
-        image_features_importances = "https://zupimages.net/up/24/35/asi7.png"
-        st.image(image_features_importances, use_column_width=True)
+        importance = pd.DataFrame(evaluation['importance_permutation']).sort_values('moyenne')
+        fig_importance = px.bar(importance, x='moyenne', y='features', error_x='ecart_type', orientation='h',
+                                labels={'moyenne': 'Baisse moyenne du R² (permutation)', 'features': 'Features'})
+        st.plotly_chart(fig_importance, use_container_width=True)
+        st.caption(f"Importance par permutation sur le jeu de test ({evaluation['importance_permutation']['n_repeats']} permutations par feature).")
 
 
 # Page de Prédiction
@@ -377,23 +604,36 @@ elif page == pages[5]:
     st.header("🔮 Prédiction")
     st.subheader('Prédiction du salaire net moyen')
     
-    with st.expander("Correspondance des intervalles") :
-        data_inter = {
-        'Intervalles': ['0', '1',  '2','3','4'],
-        'salaire_cadre_discretise (K€)': ['(15.964, 23.1]','(23.1, 30.2]','(30.2, 37.3]','(37.3, 44.4]','(44.4, 51.5]'],
-        'salaire_employe_discretise (K€)': ['(8.691,10.46]','(10.46, 12.22]','(12.22, 13.98]','(13.98, 15.74]','(15.74, 17.5]'],
-        'salaire_homme_discretise (K€)': ['(10.358, 18.8]','(18.8, 27.2]','(27.2, 35.6]','(35.6, 44.0]','(44.0, 52.4]'],
-        'salaire_+50_discretise (K€)': ['(10.454, 19.78]','(19.78, 29.06]','(29.06, 38.34]','(38.34, 47.62]','(47.62, 56.9]'],
-        'salaire_+50_femme_discretise (K€)': ['(9.478, 13.8]','(13.8, 18.1]', '(18.1, 22.4]','(22.4, 26.7]','(26.7, 31.0]']
-        }
+    # Tables, fichiers JSON et modèle chargés une seule fois ; seul le fragment de prédiction
+    # plus bas est réexécuté quand un curseur bouge
+    @st.cache_data
+    def tableau_intervalles():
+        # Bornes enregistrées avec le modèle par entrainement.py (feature_intervalles.json)
+        with open('feature_intervalles.json', 'r') as json_file:
+            intervalles = json.load(json_file)
+        data_inter = {'Intervalles': [str(niveau) for niveau in range(len(next(iter(intervalles.values()))) - 1)]}
+        for feature, bornes in intervalles.items():
+            data_inter[f"{feature} (K€)"] = [f"({round(bas, 3)}, {round(haut, 3)}]" for bas, haut in zip(bornes[:-1], bornes[1:])]
 
         # Création du DataFrame
-        tab1 = pd.DataFrame(data_inter,index=["A", "B", "C", "D", "E"])
-        df_reset = tab1.set_index("Intervalles")
-    
+        return pd.DataFrame(data_inter).set_index("Intervalles")
+
+    @st.cache_data
+    def tableau_cas_concrets():
+        data_pred = {
+                'Variables': ['salaire_cadre_discretise','salaire_employe_discretise','salaire_homme_discretise','salaire_+50_discretise','salaire_+50_femme_discretise','salaire'],
+                'Prédiction N°1': [1,0,0,0,0,13.7],
+                'Prédiction N°2': [1,1,1,1,1,18.0]  }
+        tab = pd.DataFrame.from_dict(data_pred, orient='index')
+        # Définir les colonnes en utilisant la première ligne du DataFrame
+        tab.columns = tab.iloc[0]
+        # Exclure la première ligne du DataFrame
+        return tab[1:]
+
+    with st.expander("Correspondance des intervalles") :
         # Afficher le tableau avec le style appliqué
         st.subheader("Tableau des intervalles")
-        st.table(df_reset)    
+        st.table(tableau_intervalles())
 
 
     
@@ -402,13 +642,21 @@ elif page == pages[5]:
         with open('modele.pkl', 'rb') as fichier_modele:
             modele = pickle.load(fichier_modele)
         return modele
+
+    @st.cache_resource
+    @cache_disque(fichiers=['modele.pkl'])
+    def charger_foret():
+        # Arbres du modèle empilés dans des tableaux NumPy, recalculés seulement si modele.pkl change
+        return empiler_arbres(charger_modele())
     
+    @st.cache_data
     def charger_min_max():
         # Charger les valeurs min et max des caractéristiques depuis le fichier JSON
         with open('feature_min_max.json', 'r') as json_file:
             min_max_dict = json.load(json_file)
         return min_max_dict
     
+    @st.cache_data
     def charger_target_mapping():
         # Charger le mapping des targets depuis le fichier JSON
         with open('target_encoding.json', 'r') as json_file:
@@ -416,64 +664,137 @@ elif page == pages[5]:
         # Convertir les clés en entiers
         target_mapping = {int(key): value for key, value in target_mapping.items()}
         return target_mapping
-    
-    # Charger les valeurs min et max
-    min_max_dict = charger_min_max()
 
-    
-    # Créer des curseurs pour chaque caractéristique en utilisant les noms et valeurs depuis le JSON
-    caracteristiques_entree = []
-    for feature, limits in min_max_dict.items():
-        caracteristique = st.slider(
-            f"{feature}", 
-            float(limits['min']), 
-            float(limits['max']), 
-            float((limits['min'] + limits['max']) / 2),
-            step = 1.0,
-        )
-        caracteristiques_entree.append(caracteristique)
+    @st.cache_data
+    def charger_niveaux_salaire():
+        return niveaux_salaire(charger_target_mapping())
+
+    # Courbes "et si ?" : chaque feature parcourt les niveaux 0 à 4, les autres restant fixées
+    @st.cache_data
+    @cache_disque(fichiers=['modele.pkl'])
+    def calculer_dependance_communes(salaire):
+        # ICE de toutes les communes (5 niveaux x 5 features x N communes) prédites en un seul lot
+        ice, pdp = courbes_dependance(charger_foret(), discretiser(salaire))
+        return np.quantile(ice, [0.1, 0.9], axis=0), pdp
+
+    @st.cache_data
+    def calculer_what_if(caracteristiques):
+        ice, _ = courbes_dependance(charger_foret(), [caracteristiques])
+        return ice[0]
+
+    def afficher_what_if(caracteristiques_entree):
+        (ice_bas, ice_haut), pdp = calculer_dependance_communes(salaire)
+        what_if = calculer_what_if(tuple(caracteristiques_entree))
+        niveaux = np.arange(what_if.shape[1])
+        courbes = pd.concat([
+            pd.DataFrame({'Feature': feature, 'Niveau': niveaux, 'Courbe': nom, 'Salaire prédit (€/h)': valeurs[i]})
+            for i, feature in enumerate(FEATURES)
+            for nom, valeurs in [("Saisie actuelle", what_if), ("Moyenne des communes (PDP)", pdp),
+                                 ("Communes, 10e centile (ICE)", ice_bas), ("Communes, 90e centile (ICE)", ice_haut)]
+        ], ignore_index=True)
+        fig_what_if = px.line(courbes, x='Niveau', y='Salaire prédit (€/h)', color='Courbe', facet_col='Feature',
+                              facet_col_wrap=3, markers=True, height=600)
+        fig_what_if.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split('=')[-1]))
+        st.plotly_chart(fig_what_if, use_container_width=True)
+        st.caption("Chaque courbe fait varier une seule feature de 0 à 4, les autres restant à leur valeur. "
+                   "Les courbes des communes sont calculées sur l'ensemble du jeu de données salaire.")
+
+    # Curseurs et résultat dans un fragment : bouger un curseur ne réexécute que cette fonction
+    @fragment
+    def afficher_prediction():
+        # Créer des curseurs pour chaque caractéristique en utilisant les noms et valeurs depuis le JSON
+        caracteristiques_entree = []
+        for feature, limits in charger_min_max().items():
+            caracteristique = st.slider(
+                f"{feature}", 
+                float(limits['min']), 
+                float(limits['max']), 
+                float((limits['min'] + limits['max']) / 2),
+                step = 1.0,
+                key = f"prediction_{feature}",
+            )
+            caracteristiques_entree.append(caracteristique)
+
+        # Prédiction de chaque arbre de la forêt en un seul passage vectorisé
+        votes = predictions_par_arbre(charger_foret(), np.array([caracteristiques_entree]))[0]
+
+        # Prédiction de la forêt (moyenne des arbres, non arrondie) ; seule la dispersion des votes
+        # est ramenée aux salaires connus de target_encoding.json
+        resume = resumer_votes(votes, charger_niveaux_salaire())
+
+        # Afficher la prédiction
+        st.metric("Salaire net moyen prédit (€/h)", f"{resume['prediction']:.2f}")
+        bas, haut = resume['intervalle']
+        st.write(f"**Intervalle des votes des arbres (10 % - 90 %) :** {bas:.1f} - {haut:.1f} €/h "
+                 f"(écart-type : {resume['ecart_type']:.2f})")
+        top_k = pd.DataFrame(resume['top_k'], columns=['Salaire (€/h)', 'Part des arbres'])
+        st.write("**Valeurs les plus probables :**")
+        st.dataframe(top_k.style.format({'Salaire (€/h)': '{:.1f}', 'Part des arbres': '{:.0%}'}), hide_index=True)
+
+        # Les courbes ne sont recalculées à chaque mouvement de curseur que si elles sont affichées
+        if st.checkbox("Et si ? Dépendance partielle des features", key="prediction_what_if"):
+            afficher_what_if(caracteristiques_entree)
 
-    data_pred = {
-            'Variables': ['salaire_cadre_discretise','salaire_employe_discretise','salaire_homme_discretise','salaire_+50_discretise','salaire_+50_femme_discretise','salaire'],
-            'Prédiction N°1': [1,0,0,0,0,13.7],
-            'Prédiction N°2': [1,1,1,1,1,18.0]  }
-                  
-    
     st.write("")
     
     if st.checkbox("Cas concret de prédiction"):
             #st.write("##### Cas concret de prédiction :")
-            tab = pd.DataFrame.from_dict(data_pred, orient='index')
-            # Définir les colonnes en utilisant la première ligne du DataFrame
-            tab.columns = tab.iloc[0]
-            # Exclure la première ligne du DataFrame
-            tab = tab[1:]    
-            st.table(tab)
-        
-    
-        
-    # Charger le modèle et le mapping de la cible
-    modele = charger_modele()
-    target_mapping = charger_target_mapping()
-    
-    # Préparer les caractéristiques pour la prédiction
-    caracteristiques = np.array([caracteristiques_entree])
-    
-    # Prévoir la classe avec le modèle
-    prediction_encoded = modele.predict(caracteristiques)
-    
-    # Décoder la prédiction
-    prediction_decoded = target_mapping[prediction_encoded[0]]
-    
-    # Afficher la prédiction
-    st.markdown(
-        "{prediction_encoded}", 
-        unsafe_allow_html=True
+            st.table(tableau_cas_concrets())
+
+    afficher_prediction()
+
+
+# Page PIB mondial
+elif page == pages[6]:
+    st.header("🌍 PIB mondial")
+    st.write("PIB des pays du monde (en dollars courants), d'après les données de la Banque mondiale.")
+
+    # Format long et tableaux float32 construits une seule fois pour toutes les sessions
+    @st.cache_resource
+    @cache_disque(fichiers=[FICHIER_PIB])
+    def charger_donnees_pib():
+        return charger_pib()
+
+    pib = charger_donnees_pib()
+
+    annee_debut, annee_fin = st.slider(
+        "Période",
+        min_value=pib['annee_min'],
+        max_value=pib['annee_max'],
+        value=(pib['annee_min'], pib['annee_max']),
     )
+    pays = st.multiselect(
+        "Pays à comparer",
+        pib['codes'],
+        default=['FRA', 'DEU', 'GBR', 'ITA', 'ESP'],
+        format_func=lambda code: f"{pib['noms'][code]} ({code})",
+    )
+
+    if not pays:
+        st.warning("Sélectionnez au moins un pays.")
+    else:
+        series = {code: serie(pib, code, annee_debut, annee_fin) for code in pays}
+        donnees_graphique = pd.concat(
+            [pd.DataFrame({'Année': annees, 'PIB (Md$)': valeurs / 1e9, 'Pays': pib['noms'][code]})
+             for code, (annees, valeurs) in series.items()],
+            ignore_index=True,
+        )
+        fig_pib = px.line(donnees_graphique, x='Année', y='PIB (Md$)', color='Pays', title="Évolution du PIB")
+        st.plotly_chart(fig_pib, use_container_width=True)
+
+        st.subheader(f"PIB en {annee_fin}")
+        colonnes = st.columns(4)
+        for i, (code, (annees, valeurs)) in enumerate(series.items()):
+            with colonnes[i % len(colonnes)]:
+                if len(valeurs) == 0:
+                    st.metric(pib['noms'][code], "n/a")
+                    continue
+                croissance = f"{valeurs[-1] / valeurs[0] - 1:+,.0%} depuis {annees[0]}" if len(valeurs) > 1 else None
+                st.metric(f"{pib['noms'][code]} ({annees[-1]})", f"{valeurs[-1] / 1e9:,.0f} Md$", delta=croissance)
 
 
 # Page de Conclusion
-elif page == pages[6]:
+elif page == pages[7]:
     st.header("📌 Conclusion")
     st.write("""Ce projet a été une formidable opportunité de mettre en pratique l'ensemble des compétences acquises durant notre formation. 
     Il nous a permis de développer une approche rigoureuse et méthodique de l'analyse de données, 